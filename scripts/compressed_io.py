@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compressed I/O
+
+Transparent gzip, bzip2 and xz support for the files read and written by the
+promotion utility and the validator. Inputs are recognised by their magic
+bytes, so a compressed netlist or SDC works under any name; outputs are
+compressed when their name ends in .gz, .bz2 or .xz. Data always streams
+through the codec, without decompressed copies on disk.
+
+Author: Ahmad Houraniah
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+
+# Output suffix -> codec module; every codec module provides open()
+CODECS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+MAGIC_BYTES = ((b'\x1f\x8b', gzip), (b'BZh', bz2), (b'\xfd7zXZ\x00', lzma))
+
+
+def input_codec(path):
+    """Return the codec module a file is compressed with, from its magic bytes, or None."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def output_codec(path):
+    """Return the codec module implied by an output file name, or None."""
+    return CODECS.get(os.path.splitext(str(path))[1].lower())
+
+
+def open_file(path, mode='r', encoding=None, errors=None):
+    """
+    open() with transparent compression: reads pick the codec from the file's
+    magic bytes, writes and appends from its name. Appending to a compressed
+    file adds a new stream, which every codec reads back as one file.
+    """
+    codec = input_codec(path) if mode.startswith('r') else output_codec(path)
+    if codec is None:
+        return open(path, mode, encoding=encoding, errors=errors)
+    if 'b' in mode:
+        return codec.open(path, mode)
+    return codec.open(path, mode if 't' in mode else mode + 't', encoding=encoding, errors=errors)
+
+
+def read_bytes(path):
+    """Return the decompressed content of a compressed file as a mutable bytearray."""
+    data = bytearray()
+    with open_file(path, 'rb') as f:
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                return data
+            data += chunk
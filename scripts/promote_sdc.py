@@ -11,12 +11,29 @@ Version: 2.0
 """
 
 import argparse
+import ast
+import json
 import logging
+import mmap
+import os
 import re
 import sys
+import tempfile
+import time
 from pathlib import Path
-from typing import Dict, List, Tuple, Set, Optional
+from typing import Callable, Dict, List, Tuple, Set, Optional, NamedTuple
 from collections import OrderedDict
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from bisect import bisect_left
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from compressed_io import CODECS, input_codec, open_file, read_bytes
+from yosys_json import BitNamer, io_reach, is_internal_cell, is_yosys_json, read_netlist
+from sdc_bundle import BundleWriter, read_bundle, record_origin
+from sdc_lexer import (SOURCE_COMMANDS, SOURCE_MARKER_RE, ObjectCollection, SDCCommand, SourceLocation, expand_sources,
+                       iter_sdc_commands, lex_command, read_sdc_commands)
 
 
 def escape_replacement(replacement: str) -> str:
@@ -69,102 +86,1193 @@ def setup_logging(debug: bool = False, verbose: bool = False, log_dir: str = "ru
     
     return logging.getLogger(__name__)
 
-def parse_verilog_ports(rtl_file):
-    """Extract inputs/outputs/inouts with widths from a Verilog file."""
+# Candidates for the port declaration scan, which runs over the memory-mapped
+# file. A flat alternation of literals keeps the search in the regex engine's
+# fast path; word boundaries, comments, strings and attributes are then sorted
+# out per candidate
+PORT_SCAN_RE = re.compile(rb'endmodule|macromodule|module|input|output|inout|parameter|localparam'
+                          rb'|function|task|//|/\*|"|\(\*')
+VERILOG_STRING_RE = re.compile(rb'"(?:[^"\\\n]|\\.)*"?')
+# Tokens of one declaration; group 'skip' is whitespace, comments and attributes.
+# Bytes above 0x7f are identifier characters, so UTF-8 names stay whole
+PORT_TOKEN_RE = re.compile(rb'''
+    (?P<skip>(?:\s+|//[^\n]*|/\*.*?\*/|\(\*(?!\s*\)).*?\*\))+)
+  | (?P<ident>\\\S+|[A-Za-z_\x80-\xff][\w$\x80-\xff]*)
+  | (?P<range>\[[^\[\]]*(?:\[[^\[\]]*\][^\[\]]*)*\])
+  | (?P<punct>.)
+''', re.X | re.S)
+PORT_DIRECTIONS = frozenset({'input', 'output', 'inout'})
+# Net kinds and qualifiers that may precede the range and names of a port
+PORT_TYPE_KEYWORDS = frozenset({
+    'wire', 'reg', 'logic', 'tri', 'tri0', 'tri1', 'triand', 'trior', 'wand', 'wor', 'uwire',
+    'supply0', 'supply1', 'var', 'bit', 'signed', 'unsigned', 'integer', 'int',
+})
+SUBROUTINE_END_RE = {'function': re.compile(rb'\bendfunction\b'), 'task': re.compile(rb'\bendtask\b')}
+
+
+def _is_ident_char(char):
+    """True for characters of a simple identifier; bytes of UTF-8 sequences count as letters."""
+    return char.isalnum() or char in '_$' or ord(char) > 0x7f
+
+
+def _port_tokens(data, pos):
+    """Yield (kind, value, start, end) tokens of data from pos, skipping blanks and comments; values are decoded."""
+    while True:
+        match = PORT_TOKEN_RE.match(data, pos)
+        if match is None:
+            return
+        pos = match.end()
+        if match.lastgroup != 'skip':
+            yield match.lastgroup, _decode(match.group()), match.start(), pos
+
+
+def _skip_expression(tokens):
+    """Consume tokens up to a ',', ';' or unbalanced ')' at depth 0 and return that token (or None)."""
+    depth = 0
+    for token in tokens:
+        value = token[1]
+        if token[0] == 'punct':
+            if value in '({':
+                depth += 1
+            elif value in ')}':
+                if depth == 0:
+                    return token
+                depth -= 1
+            elif value in ',;' and depth == 0:
+                return token
+    return None
+
+
+class PortInfo(NamedTuple):
+    """Direction, width and LSB of one module port, as parse_verilog_ports() records it."""
+    dir: str
+    width: int = 1
+    lsb: int = 0
+
+
+def _port_range(width_range, params):
+    """Return (width, lsb) of a packed [msb:lsb] range, evaluated over the module parameters."""
+    bounds = width_range[1:-1].split(':')
+    if len(bounds) == 2:
+        try:
+            msb, lsb = (_eval_const_expr(bound, params) for bound in bounds)
+            return abs(msb - lsb) + 1, min(msb, lsb)
+        except ValueError:
+            pass
+    # Unevaluable ranges keep the approximate width from their literal numbers, with LSB 0
+    numbers = re.findall(r'\d+', width_range)
+    if len(numbers) >= 2:
+        msb, lsb = int(numbers[0]), int(numbers[1])
+        return msb - lsb + 1, 0
+    if numbers:
+        return int(numbers[0]) + 1, 0
+    return 1, 0
+
+
+def _parse_port_declaration(data, pos, direction, params, ports):
+    """
+    Parse the names of one input/output/inout declaration starting at pos (just
+    after the direction keyword) into ports. Returns the position to resume the
+    statement scan from: a following direction keyword in an ANSI header, or
+    the end of the declaration.
+    """
+    tokens = _port_tokens(data, pos)
+    packed = []
+    group_open = True  # no name seen yet since the last net kind or range
+    for kind, value, start, end in tokens:
+        if kind == 'ident' and value in PORT_DIRECTIONS:
+            return start
+        if kind == 'range' or (kind == 'ident' and value in PORT_TYPE_KEYWORDS):
+            if not group_open:
+                # A net kind or range after a comma starts a new group with the same direction
+                packed, group_open = [], True
+            if kind == 'range':
+                packed.append(value)
+            continue
+        if kind != 'ident':
+            return start
+        group_open = False
+        if len(packed) == 1:
+            width, lsb = _port_range(packed[0], params)
+        else:
+            # Multi-dimensional packed ports flatten to one vector
+            width, lsb = 1, 0
+            for dimension in packed:
+                width *= _port_range(dimension, params)[0]
+        ports[sys.intern(value)] = PortInfo(direction, width, lsb)
+
+        # Unpacked dimensions and default values run up to the separator
+        separator = _skip_expression(tokens)
+        if separator is None:
+            return len(data)
+        if separator[1] != ',':
+            return separator[3]
+    return len(data)
+
+
+def _parse_parameter_declaration(data, pos, params):
+    """Record the NAME = value assignments of one parameter/localparam declaration. Returns the end position."""
+    tokens = _port_tokens(data, pos)
+    for kind, value, start, end in tokens:
+        if kind == 'range' or (kind == 'ident' and (value in PORT_TYPE_KEYWORDS or
+                                                    value in ('parameter', 'localparam'))):
+            continue
+        if kind != 'ident':
+            return start
+        equals = next(tokens, None)
+        if equals is None or equals[1] != '=':
+            return equals[2] if equals else len(data)
+        separator = _skip_expression(tokens)
+        expr_end = separator[2] if separator else len(data)
+        params[value] = _decode(data[equals[3]:expr_end])
+        if separator is None or separator[1] != ',':
+            return separator[3] if separator else len(data)
+    return len(data)
+
+
+def parse_verilog_ports(rtl_file, module=None):
+    """
+    Extract inputs/outputs/inouts with widths from a Verilog file, or from one
+    module of it.
+
+    One statement-level scan finds the port declarations of every module, in
+    ANSI headers and in the body, across line breaks; comments, attributes and
+    function/task arguments are skipped. Packed ranges are evaluated over the
+    module's parameters. The file is scanned memory-mapped and only declaration
+    tokens are decoded.
+    """
     ports = {}
-    with open(rtl_file) as f:
-        content = f.read()
-        
-        # Parse individual port declarations to get direction/width
-        for line in content.split('\n'):
-            # Match input/output line with potential multiple ports, including escaped identifiers
-            m = re.match(r'\s*(input|output|inout)\s*(?:wire\s*)?(?:reg\s*)?(\[[^\]]+\])?\s*(.*)', line)
-            if m:
-                direction, width, port_list = m.groups()
-                # Split by comma to get all port names, being careful with escaped identifiers
-                port_entries = []
-                current_entry = ""
-                in_escaped = False
-                
-                for char in port_list + ',':  # Add comma to process last entry
-                    if char == '\\' and not in_escaped:
-                        in_escaped = True
-                        current_entry += char
-                    elif char == ' ' and in_escaped:
-                        in_escaped = False
-                        current_entry += char
-                    elif char == ',' and not in_escaped:
-                        if current_entry.strip():
-                            port_entries.append(current_entry.strip())
-                        current_entry = ""
-                    else:
-                        current_entry += char
-                
-                for name in port_entries:
-                    name = name.strip()
-                    # Remove semicolon and any trailing comments
-                    name = re.sub(r'[;\s]*(?://.*)?$', '', name)
-                    
-                    if name and name not in ['wire', 'reg']:
-                        if width:
-                            numbers = re.findall(r'\d+', width)
-                            if len(numbers) >= 2:
-                                msb, lsb = int(numbers[0]), int(numbers[1])
-                                ports[name] = {'dir': direction, 'width': msb - lsb + 1, 'lsb': lsb}
-                            else:
-                                msb = int(numbers[0])
-                                ports[name] = {'dir': direction, 'width': msb + 1, 'lsb': 0}
-                        else:
-                            ports[name] = {'dir': direction, 'width': 1, 'lsb': 0}
+    content = map_verilog(rtl_file)
+    pos, stop = module_spans(rtl_file).get(module, (0, len(content))) if module else (0, len(content))
+
+    params = {}
+    while True:
+        match = PORT_SCAN_RE.search(content, pos, stop)
+        if match is None:
+            break
+        start, pos = match.span()
+        keyword = match.group().decode()
+        if keyword == '//':
+            end = content.find(b'\n', pos)
+            pos = end if end != -1 else len(content)
+            continue
+        if keyword == '/*' or keyword == '(*':
+            if keyword == '(*' and content[pos:pos + 1] == b')':
+                continue  # @(*)
+            end = content.find(b'*/' if keyword == '/*' else b'*)', pos)
+            pos = end + 2 if end != -1 else len(content)
+            continue
+        if keyword == '"':
+            pos = VERILOG_STRING_RE.match(content, start).end()
+            continue
+        before = chr(content[start - 1]) if start else ' '
+        after = chr(content[pos]) if pos < len(content) else ' '
+        if _is_ident_char(before) or before == '\\' or _is_ident_char(after):
+            continue  # part of a longer identifier
+        if not before.isspace() and before not in '();,/':
+            word_start = max(content.rfind(blank, 0, start) for blank in (b' ', b'\t', b'\n')) + 1
+            if content[word_start] == ord('\\'):
+                continue  # inside an escaped identifier such as \bus+input
+        if keyword in PORT_DIRECTIONS:
+            pos = _parse_port_declaration(content, pos, keyword, params, ports)
+        elif keyword in ('parameter', 'localparam'):
+            pos = _parse_parameter_declaration(content, pos, params)
+        elif keyword in SUBROUTINE_END_RE:
+            end = SUBROUTINE_END_RE[keyword].search(content, pos)
+            pos = end.end() if end else len(content)
+        elif keyword != 'endmodule':
+            params = {}
 
     return ports
 
-def parse_connection_map(target_rtl, instance_name):
+# A named connection .port( or a #( parameter override, in instantiation text without comments
+PORT_CONNECTION_RE = re.compile(r'(#)\s*\(|\.\s*(\\\S+|[A-Za-z_][\w$]*)\s*\(')
+CONNECTION_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+
+
+def _connection_end(text, pos):
+    """Return the offset of the ')' closing the parenthesis opened before pos, skipping nested groups."""
+    depth = 0
+    while pos < len(text):
+        ch = text[pos]
+        if ch == '\\':
+            # Escaped identifiers run to the next whitespace and may contain any bracket
+            while pos < len(text) and not text[pos].isspace():
+                pos += 1
+            continue
+        if ch in '({[':
+            depth += 1
+        elif ch in ')}]':
+            if depth == 0:
+                return pos
+            depth -= 1
+        pos += 1
+    return len(text)
+
+
+def _parse_port_connections(inst_text):
+    """
+    Parse the named port connections of one instantiation:
+    ip U1 (.din(ip_din_test), .dout({hi, lo[3:0]}), ...);
+    Each connection expression runs to its balanced closing parenthesis, so
+    concatenations and nested selects are kept whole, over several lines if
+    need be. Empty connections, including Design Compiler's .pin(/* open */), are skipped.
+    """
+    mapping = {}
+    text = CONNECTION_COMMENT_RE.sub(' ', inst_text)
+    pos = 0
+    while True:
+        m = PORT_CONNECTION_RE.search(text, pos)
+        if not m:
+            break
+        pos = _connection_end(text, m.end())
+        if m.group(1):
+            continue  # parameter overrides are not port connections
+        sig = ' '.join(text[m.end():pos].split())
+        if sig:
+            mapping[sys.intern(m.group(2))] = sys.intern(sig)
+    return mapping
+
+
+def parse_connection_map(target_rtl, instance_name, instance_index=None):
     """
     Build a mapping from source module ports to top-level signals.
     Assumes simple named-port instantiation:
     ip U1 (.din(ip_din_test), ...);
+
+    With an instance_index from index_module_instances(), indexed instances are
+    looked up instead of searching the file's text again.
     """
-    mapping = {}
-    with open(target_rtl) as f:
-        data = f.read()
-        inst_re = re.compile(r'\b' + re.escape(instance_name) + r'\b\s*\(.*?\);', re.S)
-        m = inst_re.search(data)
+    if instance_index is not None and instance_name in instance_index:
+        return dict(instance_index[instance_name].connections)
+    if is_yosys_json(target_rtl):
+        raise RuntimeError(f"Instance {instance_name} not found in {target_rtl}")
+
+    data = read_verilog(target_rtl)
+    name = re.escape(instance_name).encode()
+    for m in re.finditer(rb'(?<![\w$])' + name + rb'(?![\w$])\s*\(', data):
+        end = _port_list_end(data, m.end())
+        if end is None:
+            break
+        semicolon = SEMICOLON_RE.match(data, end)
+        if semicolon:
+            return _parse_port_connections(_decode(data[m.start():semicolon.end()]))
+    raise RuntimeError(f"Instance {instance_name} not found in {target_rtl}")
+
+
+VERILOG_KEYWORDS = frozenset({
+    'module', 'endmodule', 'input', 'output', 'inout', 'wire', 'reg', 'logic', 'tri', 'wand', 'wor',
+    'assign', 'always', 'always_ff', 'always_comb', 'always_latch', 'initial', 'if', 'else', 'case',
+    'casex', 'casez', 'endcase', 'for', 'while', 'repeat', 'forever', 'begin', 'end', 'generate',
+    'endgenerate', 'genvar', 'parameter', 'localparam', 'function', 'endfunction', 'task', 'endtask',
+    'return', 'integer', 'int', 'signed', 'unsigned', 'default', 'posedge', 'negedge', 'or', 'and',
+    'not', 'typedef', 'struct', 'enum', 'packed', 'defparam', 'specify', 'endspecify', 'fork', 'join',
+    'automatic', 'static', 'void', 'bit', 'byte', 'real', 'time', 'string', 'import', 'export', 'wait',
+    'disable', 'assert', 'property', 'sequence', 'interface', 'modport', 'package', 'class',
+})
+
+# Patterns over memory-mapped Verilog files (see read_verilog) are bytes patterns
+VERILOG_COMMENT_RE = re.compile(rb'//[^\n]*|/\*.*?\*/', re.S)
+VERILOG_IDENT = rb'(?:[A-Za-z_][\w$]*|\\\S+)'
+
+# Structural scan of a Verilog file: module scopes, generate scopes and instantiations
+HIER_SCAN_RE = re.compile(rb'''
+    (?P<module>\bmodule\s+(?P<module_name>[A-Za-z_][\w$]*))
+  | (?P<endmodule>\bendmodule\b)
+  | (?P<for>\bfor\s*\((?P<init>[^;]*);(?P<cond>[^;]*);(?P<step>[^)]*)\)\s*begin\b
+        (?:\s*:\s*(?P<for_label>[A-Za-z_][\w$]*))?)
+  | (?P<begin>\bbegin\b(?:\s*:\s*(?P<label>[A-Za-z_][\w$]*))?)
+  | (?P<end>\bend\b)
+  | (?P<inst>(?P<inst_module>(?<![\w$])''' + VERILOG_IDENT + rb''')\s*
+        (?:\#\s*\((?:[^()]|\([^()]*\))*\)\s*)?
+        (?P<inst_name>''' + VERILOG_IDENT + rb''')\s*(?P<inst_range>\[[^\]]*\])?\s*\()
+''', re.X | re.S)
+
+PAREN_RE = re.compile(rb'[()]')
+PARAMETER_RE = re.compile(rb'\b(?:parameter|localparam)\b(?:\s+(?:integer|int|signed|\[[^\]]*\]))*'
+                          rb'\s+([A-Za-z_]\w*)\s*=\s*([^,;)]+)')
+VERILOG_NUMBER_RE = re.compile(r"\d*'[sS]?([dDhHbBoO])([0-9a-fA-F_]+)")
+FOR_INIT_RE = re.compile(r'(?:genvar\s+|int\s+|integer\s+)?([A-Za-z_]\w*)\s*=\s*(.+)$', re.S)
+FOR_COND_RE = re.compile(r'([A-Za-z_]\w*)\s*(<=|<|>=|>|!=)\s*(.+)$', re.S)
+FOR_STEP_RE = re.compile(r'([A-Za-z_]\w*)\s*(?:(\+\+|--)|([+-])=\s*(.+)|=\s*\1\s*([+-])\s*(.+))$', re.S)
+
+# Upper bound on generate-loop iterations, guarding against unevaluable loops
+MAX_GENERATE_ITERATIONS = 1 << 20
+
+
+class ModuleInstance(NamedTuple):
+    """One instantiation found by index_module_instances()."""
+    name: str
+    module: str
+    parent: Optional[str]
+    connections: Dict[str, str]
+    array_element: Optional[Tuple[int, int]] = None  # (offset from the right bound, element count)
+    span: Optional[Tuple[int, int]] = None  # (start, end) offsets of the instantiation in its file
+
+
+def map_verilog(rtl_file, access=mmap.ACCESS_READ):
+    """
+    Memory-map a Verilog file; an empty file, which cannot be mapped, gives b''.
+    A compressed file cannot be mapped either and is decompressed into memory.
+    """
+    if input_codec(rtl_file):
+        return read_bytes(rtl_file)
+    with open(rtl_file, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=access)
+        except ValueError:
+            return b''
+    if hasattr(mmap, 'MADV_WILLNEED'):
+        # Start the kernel's readahead now, so scans fault on fewer pages while holding the GIL
+        data.madvise(mmap.MADV_WILLNEED)
+    return data
+
+
+@lru_cache(maxsize=None)
+def read_verilog(rtl_file):
+    """
+    Memory-map a Verilog file with its comments blanked out, keeping offsets and
+    line breaks intact.
+
+    The mapping is copy-on-write, so blanking only copies the pages that hold
+    comments and the rest stays backed by the file: scanning a multi-GB netlist
+    does not need memory proportional to its size. Every pass over the same file
+    shares one mapping; scan it with bytes patterns and _decode() only the
+    matched regions.
+    """
+    data = map_verilog(rtl_file, mmap.ACCESS_COPY)
+    for comment in VERILOG_COMMENT_RE.finditer(data):
+        data[comment.start():comment.end()] = re.sub(rb'[^\n]', b' ', comment.group())
+    return data
+
+
+def _decode(data):
+    """Decode a region of a mapped Verilog file."""
+    return data.decode('utf-8', 'replace')
+
+
+def _scan_verilog(pattern, data, pos=0, endpos=None):
+    """Like pattern.findall(data) over a mapped file, with every group decoded to str."""
+    for match in pattern.finditer(data, pos, len(data) if endpos is None else endpos):
+        groups = tuple(_decode(group or b'') for group in match.groups())
+        yield groups[0] if len(groups) == 1 else groups
+
+
+SEMICOLON_RE = re.compile(rb'\s*;')
+# Port list with at most one level of nested parentheses, the common .port(net) form
+FLAT_PORT_LIST_RE = re.compile(rb'[^()]*(?:\([^()]*\)[^()]*)*\)')
+
+
+def _port_list_end(data, port_list_start):
+    """Return the offset after the ')' closing the port list opened before port_list_start, or None."""
+    flat = FLAT_PORT_LIST_RE.match(data, port_list_start)
+    if flat:
+        return flat.end()
+    depth = 1
+    for paren in PAREN_RE.finditer(data, port_list_start):
+        depth += 1 if paren.group(0) == b'(' else -1
+        if depth == 0:
+            return paren.end()
+    return None
+
+
+def _eval_const_expr(expr, params):
+    """Evaluate a constant integer expression over literals and parameters; raises ValueError."""
+    def number(match):
+        base = {'d': 10, 'h': 16, 'b': 2, 'o': 8}[match.group(1).lower()]
+        return str(int(match.group(2).replace('_', ''), base))
+    expr = VERILOG_NUMBER_RE.sub(number, expr.strip())
+
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in params:
+            return _eval_const_expr(params[node.id], {k: v for k, v in params.items() if k != node.id})
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = evaluate(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp):
+            left, right = evaluate(node.left), evaluate(node.right)
+            operators = {ast.Add: lambda: left + right, ast.Sub: lambda: left - right,
+                         ast.Mult: lambda: left * right, ast.Div: lambda: left // right,
+                         ast.FloorDiv: lambda: left // right, ast.Mod: lambda: left % right,
+                         ast.LShift: lambda: left << right, ast.RShift: lambda: left >> right}
+            if type(node.op) in operators and not (right == 0 and type(node.op) in (ast.Div, ast.FloorDiv, ast.Mod)):
+                return operators[type(node.op)]()
+        raise ValueError(f"Not a constant expression: {expr}")
+
+    try:
+        return evaluate(ast.parse(expr, mode='eval'))
+    except (SyntaxError, RecursionError):
+        raise ValueError(f"Not a constant expression: {expr}")
+
+
+def _generate_loop_values(init, cond, step, params):
+    """Return (genvar, values) of a generate for-loop header, or None if it cannot be evaluated."""
+    init_match, cond_match, step_match = FOR_INIT_RE.match(init.strip()), FOR_COND_RE.match(cond.strip()), \
+        FOR_STEP_RE.match(step.strip())
+    if not (init_match and cond_match and step_match) or init_match.group(1) != cond_match.group(1):
+        return None
+    genvar = init_match.group(1)
+    try:
+        value = _eval_const_expr(init_match.group(2), params)
+        bound = _eval_const_expr(cond_match.group(3), params)
+        if step_match.group(2):
+            delta = 1 if step_match.group(2) == '++' else -1
+        elif step_match.group(3):
+            delta = _eval_const_expr(step_match.group(4), params) * (1 if step_match.group(3) == '+' else -1)
+        else:
+            delta = _eval_const_expr(step_match.group(6), params) * (1 if step_match.group(5) == '+' else -1)
+    except ValueError:
+        return None
+
+    compare = {'<': int.__lt__, '<=': int.__le__, '>': int.__gt__, '>=': int.__ge__, '!=': int.__ne__}
+    values = []
+    while compare[cond_match.group(2)](value, bound) and delta and len(values) < MAX_GENERATE_ITERATIONS:
+        values.append(value)
+        value += delta
+    return genvar, values
+
+
+def _fold_const_selects(signal, bindings, params):
+    """Substitute genvar values into a connection and fold constant bit selects."""
+    for genvar, value in bindings.items():
+        signal = re.sub(r'\b' + re.escape(genvar) + r'\b', str(value), signal)
+
+    def fold(match):
+        inner = match.group(1)
+        parts = re.fullmatch(r'(.+?)(\+:|-:|:)(.+)', inner)
+        try:
+            if not parts:
+                return f"[{_eval_const_expr(inner, params)}]"
+            left, right = _eval_const_expr(parts.group(1), params), _eval_const_expr(parts.group(3), params)
+        except ValueError:
+            return match.group(0)
+        if parts.group(2) == '+:':
+            return f"[{left + right - 1}:{left}]"
+        if parts.group(2) == '-:':
+            return f"[{left}:{left - right + 1}]"
+        return f"[{left}:{right}]"
+    return re.sub(r'\[([^\[\]]+)\]', fold, signal)
+
+
+def index_module_instances(target_rtl, parent=None):
+    """
+    Index every module instantiation of a Verilog file in one pass.
+
+    Returns an OrderedDict of instance path -> ModuleInstance. Instances inside
+    generate for-loops are expanded per iteration (label[i]/name) when the loop
+    bounds are constant, and instance arrays (name [3:0]) yield one entry per
+    element. The first occurrence wins when a name repeats across modules;
+    pass parent to index only the instances inside that module, in which case
+    only that module's definition is scanned.
+    """
+    data, pos, end = _module_region(target_rtl, parent)
+    params = {name: value.strip() for name, value in _scan_verilog(PARAMETER_RE, data, pos, end)}
+
+    instances = OrderedDict()
+    module = None
+    scopes = []  # (label, genvar, values) per open begin/for block
+    while True:
+        m = HIER_SCAN_RE.search(data, pos, end)
         if not m:
-            raise RuntimeError(f"Instance {instance_name} not found in {target_rtl}")
-        inst_text = m.group(0)
-        
-        for line in inst_text.split('\n'):
-            if '.' in line and '(' in line and ')' in line:
+            break
+        pos = m.end()
+        group = lambda name: _decode(m.group(name)) if m.group(name) is not None else None
+        if m.group('module'):
+            module, scopes = sys.intern(group('module_name')), []
+        elif m.group('endmodule'):
+            module, scopes = None, []
+        elif m.group('for'):
+            loop = _generate_loop_values(group('init'), group('cond'), group('step'), params)
+            genvar, values = loop if loop else (None, None)
+            scopes.append((group('for_label'), genvar, values))
+        elif m.group('begin'):
+            scopes.append((group('label'), None, None))
+        elif m.group('end'):
+            if scopes:
+                scopes.pop()
+        else:
+            inst_module, inst_name = sys.intern(group('inst_module')), group('inst_name')
+            if module is None or inst_module in VERILOG_KEYWORDS or inst_name in VERILOG_KEYWORDS:
+                pos = m.end('inst_module')
+                continue
+            # Find the closing parenthesis of the port list and the terminating semicolon
+            port_list_end = _port_list_end(data, m.end())
+            if port_list_end is None:
+                break
+            semicolon = SEMICOLON_RE.match(data, port_list_end)
+            if not semicolon:
+                pos = m.end('inst_module')
+                continue
+            pos = semicolon.end()
+            if parent is not None and module != parent:
+                continue
+            connections = _parse_port_connections(_decode(data[m.start():pos]))
+
+            # Expand enclosing generate loops into concrete scope paths
+            paths = [('', {})]
+            for label, genvar, values in scopes:
+                if genvar is None:
+                    if label:
+                        paths = [(f"{prefix}{label}/", bindings) for prefix, bindings in paths]
+                    continue
+                if values is None:
+                    paths = [(f"{prefix}{label or 'genblk'}[*]/", bindings) for prefix, bindings in paths]
+                    continue
+                paths = [(f"{prefix}{label or 'genblk'}[{value}]/", {**bindings, genvar: value})
+                         for prefix, bindings in paths for value in values]
+
+            elements = [(None, None)]
+            if m.group('inst_range'):
                 try:
-                    # Handle escaped port names like .\escaped_port/name (signal)
-                    line_clean = line.strip()
-                    
-                    # Extract port name - may be escaped
-                    port_match = re.search(r'\.(\\\S+|\w+)\s*\(', line_clean)
-                    if port_match:
-                        port = port_match.group(1)
-                        
-                        # Extract signal name
-                        sig_match = re.search(r'\(([^)]+)\)', line_clean)
-                        if sig_match:
-                            sig = sig_match.group(1).strip().split(',')[0].split('//')[0].strip()
-                            
-                            # Filter out pathological patterns that are comments or empty
-                            # These indicate unconnected signals from Design Compiler
-                            if sig.startswith('/*') or sig.startswith('//') or not sig:
-                                continue  # Skip pathological connections
-                                
-                            if port and sig:
-                                mapping[port] = sig
-                except:
+                    left, _, right = group('inst_range')[1:-1].partition(':')
+                    left = _eval_const_expr(left, params)
+                    right = _eval_const_expr(right, params) if right else left
+                    step = 1 if left <= right else -1
+                    indices = range(left, right + step, step)
+                    elements = [(index, (abs(index - right), len(indices))) for index in indices]
+                except ValueError:
+                    pass
+
+            for prefix, bindings in paths:
+                bound = connections
+                if bindings:
+                    bound = {port: _fold_const_selects(sig, bindings, params) for port, sig in connections.items()}
+                for index, array_element in elements:
+                    name = f"{prefix}{inst_name}" + (f"[{index}]" if index is not None else '')
+                    if name not in instances:
+                        instances[name] = ModuleInstance(name, inst_module, module, bound, array_element,
+                                                         (m.start(), pos))
+    return instances
+
+
+def find_module_instances(instance_index, module_name):
+    """
+    Return the instances of module_name instantiated by top-level modules of the
+    indexed file, i.e. modules that no other module in the file instantiates.
+    """
+    instantiated = {instance.module for instance in instance_index.values()}
+    return [instance for instance in instance_index.values()
+            if instance.module == module_name and instance.parent not in instantiated]
+
+
+MODULE_DEF_RE = re.compile(rb'\bmodule\s+([A-Za-z_][\w$]*)')
+
+
+@lru_cache(maxsize=None)
+def module_spans(rtl_file):
+    """Return an OrderedDict of module name -> (start, end) offsets of its definition in a Verilog file."""
+    spans = OrderedDict()
+    for m in MODULE_BODY_RE.finditer(read_verilog(rtl_file)):
+        spans.setdefault(_decode(m.group(1)), m.span())
+    return spans
+
+
+def _module_region(rtl_file, module=None):
+    """Return (data, start, end) of a mapped Verilog file, narrowed to one module's definition if given."""
+    data = read_verilog(rtl_file)
+    start, end = module_spans(rtl_file).get(module, (0, len(data))) if module else (0, len(data))
+    return data, start, end
+
+
+def find_top_modules(rtl_file):
+    """
+    Return the modules of a Verilog file that no other module in it instantiates.
+
+    Modules that instantiate others from the same file come first, then the
+    rest, each in file order. Only module names are matched, so no instance is
+    parsed to find the top.
+    """
+    spans = module_spans(rtl_file)
+    if len(spans) < 2:
+        return list(spans)
+    data = read_verilog(rtl_file)
+    names = sorted(spans, key=len, reverse=True)
+    reference_re = re.compile(b'(' + b'|'.join(re.escape(name).encode() for name in names) +
+                              rb')(?:\s*#|\s+[A-Za-z_\\])')
+    instantiated, parents = set(), set()
+    for module, (start, end) in spans.items():
+        for m in reference_re.finditer(data, start, end):
+            name = _decode(m.group(1))
+            if name == module or (m.start() and _is_ident_char(chr(data[m.start() - 1]))):
+                continue
+            instantiated.add(name)
+            parents.add(module)
+    tops = [module for module in spans if module not in instantiated]
+    return sorted(tops, key=lambda module: module not in parents)
+
+
+def index_module_files(rtl_files):
+    """Map each module name to the first of rtl_files that defines it."""
+    module_files = {}
+    for rtl in rtl_files:
+        for module in _scan_verilog(MODULE_DEF_RE, read_verilog(rtl)):
+            module_files.setdefault(module, rtl)
+    return module_files
+
+
+class Filelist(NamedTuple):
+    """Verilog files and include directories read from a -f filelist."""
+    files: List[str]
+    incdirs: List[str]
+
+
+def is_filelist(path):
+    """True for an --target_rtl/--source_rtl argument naming a filelist (*.f) instead of a Verilog file."""
+    return path.endswith('.f')
+
+
+def read_filelist(path, relative_to=None, seen=None):
+    """
+    Read a simulator-style filelist: one Verilog file per line, +incdir+ directories,
+    nested -f lists (paths relative to the working directory, like the list given
+    on the command line) and -F lists (paths relative to that list), -v library
+    files, // and # comments and $VAR expansion. Other options are ignored.
+    """
+    seen = set() if seen is None else seen
+    files, incdirs = [], []
+    if os.path.realpath(path) in seen:
+        return Filelist(files, incdirs)
+    seen.add(os.path.realpath(path))
+
+    def resolve(entry, base):
+        entry = os.path.expanduser(os.path.expandvars(entry))
+        return os.path.normpath(os.path.join(base, entry)) if base else os.path.normpath(entry)
+
+    with open_file(path) as f:
+        tokens = re.sub(r'//[^\n]*|#[^\n]*', '', f.read()).split()
+    base = relative_to
+    option = None
+    for token in tokens:
+        if option is not None:
+            if option in ('-f', '-F'):
+                nested = read_filelist(resolve(token, base), os.path.dirname(resolve(token, base))
+                                       if option == '-F' else None, seen)
+                files.extend(nested.files)
+                incdirs.extend(nested.incdirs)
+            elif option == '-v':
+                files.append(resolve(token, base))
+            option = None
+        elif token in ('-f', '-F', '-v', '-y'):
+            option = token
+        elif token.startswith('+incdir+'):
+            incdirs.extend(resolve(d, base) for d in token[len('+incdir+'):].split('+') if d)
+        elif not token.startswith(('+', '-')):
+            files.append(resolve(token, base))
+    for rtl in files:
+        if not os.path.isfile(rtl):
+            raise RuntimeError(f"{path}: Verilog file {rtl} not found")
+    return Filelist(list(dict.fromkeys(files)), list(dict.fromkeys(incdirs)))
+
+
+INCLUDE_RE = re.compile(rb'`include\s+"([^"]+)"')
+
+
+class VerilogFileIndex(NamedTuple):
+    """Per-module tables of one Verilog file, built by index_verilog_file()."""
+    path: str
+    ports: Dict[str, Dict[str, PortInfo]]  # module -> parse_verilog_ports() table
+    instances: Dict[str, Dict[str, ModuleInstance]]  # module -> index_module_instances() index
+    includes: List[str]  # `include'd files that exist
+
+
+class DesignIndex(NamedTuple):
+    """
+    Module tables of a whole design. instances is filled on demand for modules
+    not parsed up front (see design_module_instances).
+    """
+    module_files: Dict[str, str]  # module -> first file that defines it
+    instances: Dict[str, Dict[str, ModuleInstance]]
+    ports: Dict[str, Dict[str, PortInfo]]
+
+
+def index_verilog_file(rtl_file, incdirs=()):
+    """
+    Parse the port table and instance index of every module of one Verilog file.
+    `include directives are resolved against the file's directory and incdirs.
+    Runs in index_design()'s worker processes, so results are plain picklable data.
+    """
+    ports, instances = {}, {}
+    for module in module_spans(rtl_file):
+        ports[module] = parse_verilog_ports(rtl_file, module)
+        instances[module] = index_module_instances(rtl_file, parent=module)
+    includes = []
+    for name in _scan_verilog(INCLUDE_RE, read_verilog(rtl_file)):
+        for directory in [os.path.dirname(rtl_file)] + list(incdirs):
+            candidate = os.path.normpath(os.path.join(directory, name))
+            if os.path.isfile(candidate):
+                includes.append(candidate)
+                break
+    return VerilogFileIndex(rtl_file, ports, instances, includes)
+
+
+def index_design(rtl_files, incdirs=(), jobs=None, logger=None):
+    """
+    Index every module of rtl_files, and of the files they `include, into one
+    DesignIndex. Files are parsed concurrently in a pool of jobs processes
+    (default: one per CPU) and merged in input order, the first definition of
+    a module winning as in index_module_files().
+    """
+    jobs = jobs or os.cpu_count() or 1
+    results = {}
+    order = list(dict.fromkeys(rtl_files))
+    start = time.time()
+    if jobs == 1 or len(order) == 1:
+        for rtl in order:  # grows with included files
+            result = results[rtl] = index_verilog_file(rtl, incdirs)
+            order.extend(include for include in result.includes if include not in order)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(index_verilog_file, rtl, incdirs): rtl for rtl in order}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = results[futures.pop(future)] = future.result()
+                    for include in result.includes:
+                        if include not in order:
+                            order.append(include)
+                            futures[pool.submit(index_verilog_file, include, incdirs)] = include
+
+    design = DesignIndex({}, {}, {})
+    for rtl in order:
+        result = results[rtl]
+        for module in result.ports:
+            if module not in design.module_files:
+                design.module_files[module] = rtl
+                design.ports[module] = result.ports[module]
+                design.instances[module] = result.instances[module]
+    if logger:
+        logger.info(f"Indexed {len(design.module_files)} modules from {len(order)} files "
+                    f"with {min(jobs, len(order))} workers in {time.time() - start:.2f}s")
+    return design
+
+
+class InputPrefetcher:
+    """
+    Load input files concurrently in a thread pool ahead of their use.
+
+    Each file is handed to the loader that would read it anyway (read_verilog,
+    read_sdc_commands, ...), so the worker's result is the data the main thread
+    uses and nothing is read twice. Reads and decompression release the GIL, so
+    on network filesystems the latencies of all inputs overlap each other and
+    the work of the main thread on files that have already arrived.
+    """
+
+    def __init__(self, loaders, threads=None):
+        self.start = time.perf_counter()
+        self.wait_time = 0.0
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.futures = {path: self.pool.submit(loader, path) for path, loader in loaders.items() if path}
+
+    def load(self, path, loader):
+        """
+        Return loader(path), from the prefetch if path was submitted; errors such
+        as a missing file are raised here. A path is handed out once, later calls
+        run the loader directly.
+        """
+        future = self.futures.pop(path, None)
+        if future is None:
+            return loader(path)
+        start = time.perf_counter()
+        try:
+            return future.result()
+        finally:
+            self.wait_time += time.perf_counter() - start
+
+    def ready(self, paths, loader):
+        """Yield paths in order, each once it is loaded, so the first can be used while the rest arrive."""
+        for path in paths:
+            self.load(path, loader)
+            yield path
+
+    def close(self, logger=None):
+        """
+        Stop the pool and log how long the main thread was blocked on loads it
+        had not finished, against the rest of the run. The blocked time includes
+        the loaders' own parsing in the workers, so it bounds the I/O stall from above.
+        """
+        self.pool.shutdown(wait=False)
+        self.futures.clear()
+        if logger:
+            elapsed = time.perf_counter() - self.start
+            logger.info(f"Waited {self.wait_time:.2f}s on input loading, compute {elapsed - self.wait_time:.2f}s")
+
+
+def design_module_instances(design, module):
+    """Return the instance index of one module of the design, parsing its file on first use."""
+    instances = design.instances.get(module)
+    if instances is None:
+        rtl = design.module_files.get(module)
+        instances = index_module_instances(rtl, parent=module) if rtl else OrderedDict()
+        design.instances[module] = instances
+    return instances
+
+
+def design_top_modules(design, rtl_files):
+    """
+    Return the modules defined in rtl_files that no other module of those files
+    instantiates, those that instantiate other modules first.
+    """
+    rtl_files = set(rtl_files)
+    defined = [module for module, rtl in design.module_files.items() if rtl in rtl_files]
+    instantiated = {record.module for module in defined for record in design_module_instances(design, module).values()}
+    tops = [module for module in defined if module not in instantiated]
+    return sorted(tops, key=lambda module: not design.instances[module])
+
+
+def index_yosys_netlist(path):
+    """
+    Build the DesignIndex of a Yosys JSON netlist: the port table and instance
+    index of every module, with connections spelled from their bit arrays.
+    """
+    design = DesignIndex(OrderedDict(), {}, {})
+    for name, module in read_netlist(path).items():
+        design.module_files[name] = path
+        design.ports[name] = {sys.intern(port): PortInfo(direction, len(wire.bits), wire.offset)
+                              for port, (direction, wire) in module.ports.items()}
+        namer = BitNamer(module)
+        instances = design.instances[name] = OrderedDict()
+        for cell_name, cell in module.cells.items():
+            if is_internal_cell(cell.type):
+                continue
+            connections = {}
+            for port, bits in cell.connections.items():
+                expr = namer.expression(bits)
+                if expr is not None:
+                    connections[sys.intern(port)] = sys.intern(expr)
+            instances[cell_name] = ModuleInstance(cell_name, cell.type, name, connections)
+    return design
+
+
+def netlist_top_modules(design, path):
+    """Top modules of a Yosys JSON netlist: those Yosys marked as top, otherwise as design_top_modules()."""
+    return [name for name, module in read_netlist(path).items() if module.top] or design_top_modules(design, [path])
+
+
+def resolve_instance_chain(instance_path, target_rtl, instance_index, design):
+    """
+    Split a hierarchical instance path (u_subsys/u_ip) into levels, top first.
+
+    Returns a list of (rtl_file, ModuleInstance), where each instance is found in
+    the module its parent instantiates. Names indexed as a whole, like generate
+    paths g_lane[0]/u_lane, are kept as one level.
+    """
+    chain = []
+    rtl, index, remaining = target_rtl, instance_index, instance_path
+    while remaining:
+        parts = remaining.split('/')
+        for cut in range(len(parts), 0, -1):
+            name = '/'.join(parts[:cut])
+            if name in index:
+                break
+        else:
+            raise RuntimeError(f"Instance {remaining} not found in {rtl}")
+        record = index[name]
+        chain.append((rtl, record))
+        remaining = '/'.join(parts[cut:])
+        if remaining:
+            rtl = design.module_files.get(record.module)
+            if rtl is None:
+                raise RuntimeError(f"No --hier_rtl file defines module {record.module} (instance {name})")
+            index = design_module_instances(design, record.module)
+    return chain
+
+
+def _compose_connection(expr, upper_mapping, inner_ranges, outer_ranges):
+    """
+    Rewrite a connection expressed on a module's ports into its parent's signals.
+    Concatenations are rewritten part by part. Returns None when the expression
+    is not a reference or concatenation, or some part does not reach a port of
+    the module.
+    """
+    expr = expr.strip()
+    if expr.startswith('{') and expr.endswith('}'):
+        parts = [_compose_connection(part, upper_mapping, inner_ranges, outer_ranges)
+                 for part in expr[1:-1].split(',')]
+        if None in parts:
+            return None
+        return '{' + ', '.join(part[1:-1] if part.startswith('{') else part for part in parts) + '}'
+    m = NET_REF_RE.match(expr)
+    if not m or m.group(1) not in upper_mapping:
+        return None
+    net, msb, lsb = m.groups()
+    outer = upper_mapping[net]
+    if msb is None:
+        return outer
+    outer_match = NET_REF_RE.match(outer)
+    if not outer_match:
+        return None
+    outer_net, outer_msb, outer_lsb = outer_match.groups()
+    if outer_msb is not None and outer_lsb is None:
+        return outer  # single-bit connection: only bit 0 of the port exists above
+    base = min(int(outer_msb), int(outer_lsb)) if outer_lsb is not None else outer_ranges.get(outer_net, (0, 1))[0]
+    port_lsb = inner_ranges.get(net, (0, 1))[0]
+    high = base + int(msb) - port_lsb
+    if lsb is None:
+        return f"{outer_net}[{high}]"
+    return f"{outer_net}[{high}:{base + int(lsb) - port_lsb}]"
+
+
+def compose_hierarchy_mapping(chain, bit_connectivity, logger=None):
+    """
+    Compose the per-level connection maps of an instance chain into one mapping
+    from the innermost instance's ports to top-level signals.
+
+    Each level is traced through its module's assigns to that module's ports and
+    then rewritten onto the level above; ports that stay internal to some level
+    are left out of the mapping.
+    """
+    upper = None
+    for rtl, record in chain:
+        level_trace = trace_assigns(rtl, record.parent)
+        level = bit_connectivity if upper is None else analyze_bit_connectivity(rtl, record.parent)
+        mapping = {}
+        for port, sig in record.connections.items():
+            traced = level_trace.trace(sig)
+            if upper is not None:
+                composed = _compose_connection(traced, upper, level.ranges, bit_connectivity.ranges)
+                if composed is None:
+                    if logger:
+                        logger.debug(f"{record.name}.{port}: {sig} does not reach a port of {record.parent}")
                     continue
-        
-    return mapping
+                traced = composed
+            mapping[port] = traced
+        upper = mapping
+    return upper
 
-def expand_vector_signals(mapping, source_ports, logger=None, mappings_file=None):
-    """Expand vector signals to bit-level mapping."""
-    bit_map = {}
+
+def slice_array_connections(mapping, array_element, source_ports, net_ranges):
+    """
+    Give one element of an instance array its slice of each connected bus.
+    A plain net is sliced when its declared width is element count times the port width.
+    """
+    offset, count = array_element
+    sliced = {}
+    for port, sig in mapping.items():
+        port_width = source_ports[port].width if port in source_ports else 1
+        declared = net_ranges.get(sig)
+        if declared is not None and count > 1 and declared[1] == port_width * count:
+            lo = declared[0] + offset * port_width
+            sig = f"{sig}[{lo}]" if port_width == 1 else f"{sig}[{lo + port_width - 1}:{lo}]"
+        sliced[port] = sig
+    return sliced
+
+
+MODULE_BODY_RE = re.compile(rb'\bmodule\s+([A-Za-z_][\w$]*)\b(.*?)\bendmodule\b', re.S)
+# Trailing bit, part or wildcard select of a path element, e.g. data_reg[3]
+ELEMENT_SELECT_RE = re.compile(r'(?:\[[^\[\]]*\])+$')
+
+
+def _split_hier_path(path):
+    """
+    Split a hierarchical path on '/'. An escaped element (\\name) runs to the end
+    of the path because escaped identifiers may themselves contain '/'.
+    """
+    elements = []
+    pos = 0
+    while pos < len(path):
+        if path[pos] == '\\':
+            elements.append(path[pos:])
+            break
+        end = path.find('/', pos)
+        if end == -1:
+            end = len(path)
+        elements.append(path[pos:end])
+        pos = end + 1
+    return elements
+
+
+class HierarchyIndex:
+    """
+    Trie of the hierarchical names (instances, nets and registers) of the target design.
+
+    Each node is a dict of child name -> node. Instance nodes carry their module
+    under the '' key: the module name when its RTL is known, None for modules
+    without RTL (library cells, black boxes) whose contents cannot be checked.
+    All instances of one module share that module's scope node, so the trie grows
+    with the number of modules rather than the number of instances.
+    """
+
+    def __init__(self, root, cache_size=1 << 16):
+        self.root = root
+        self.promote = lru_cache(maxsize=cache_size)(self._promote)
+
+    def _children(self, node, element):
+        if element in node:
+            return [node[element]]
+        base = ELEMENT_SELECT_RE.sub('', element)
+        if base != element and base in node:
+            return [node[base]]
+        if '*' in element or '?' in element:
+            pattern = element.replace('[', '[[]')
+            return [child for name, child in node.items() if name and fnmatchcase(name, pattern)]
+        return []
+
+    def resolve(self, path, pin=False):
+        """
+        Return True when path names an object of the design. For pins the last
+        element is the pin: it must be a port of a known module, while any pin
+        name is accepted on registers, nets and cells of unknown modules.
+        """
+        elements = _split_hier_path(path)
+        if pin:
+            elements, pin_name = elements[:-1], elements[-1]
+        nodes = [self.root]
+        for element in elements:
+            matched = []
+            for node in nodes:
+                if '' in node and node[''] is None:
+                    return True
+                matched.extend(self._children(node, element))
+            if not matched:
+                return False
+            nodes = matched
+        if not pin:
+            return True
+        return any(node.get('') is None or self._children(node, pin_name) for node in nodes)
+
+    def _promote(self, path, instance_name, pin=True):
+        promoted = prefix_object_path(path, instance_name)
+        return promoted, promoted == path or self.resolve(promoted, pin)
+
+
+def build_hierarchy_index(target_rtl, instance_index, design, top=None):
+    """
+    Build the HierarchyIndex of a design from the instance index of its top file
+    and the RTL of the modules it instantiates (see DesignIndex).
+    Modules are indexed on demand as the hierarchy reaches them; top names the
+    root module, otherwise the roots are the uninstantiated parents in the index.
+    """
+    scopes = {}
+    indexed_parents = dict.fromkeys(record.parent for record in instance_index.values())
+
+    def scope(module):
+        if module in scopes:
+            return scopes[module]
+        rtl = design.module_files.get(module)
+        node = scopes[module] = {'': module if rtl else None}
+        if rtl is None:
+            return node
+        if is_yosys_json(rtl):
+            for name in read_netlist(rtl)[module].nets:
+                node.setdefault(name, {})
+        elif module in module_spans(rtl):
+            for decl in _scan_verilog(NET_DECL_RE, *_module_region(rtl, module)):
+                for name in decl[3].split(','):
+                    node.setdefault(name.strip(), {})
+        if rtl == target_rtl and module in indexed_parents:
+            records = instance_index.values()
+        else:
+            records = design_module_instances(design, module).values()
+        for record in records:
+            if record.parent != module:
+                continue
+            parent = node
+            *scope_names, leaf = _split_hier_path(record.name)
+            for name in scope_names:
+                parent = parent.setdefault(name, {})
+            parent[leaf] = scope(record.module)
+        return node
+
+    root = {}
+    instantiated = {record.module for record in instance_index.values()}
+    tops = [top] if top else [parent for parent in indexed_parents if parent not in instantiated]
+    for module in tops:
+        root.update(scope(module))
+    root.pop('', None)
+    return HierarchyIndex(root)
+
+
+# Trailing single-bit select, e.g. data[3]
+BIT_SUFFIX_RE = re.compile(r'\[\d+\]$')
+# Descending part-select on a connection expression, e.g. bus[15:8]
+PART_SELECT_RE = re.compile(r'^(.*\S)\s*\[(\d+):(\d+)\]$')
+
+
+class PortMapping(NamedTuple):
+    """
+    Mapping of one source port onto a top-level signal.
+
+    Vector ports are stored as a base name plus LSB offset and width instead of
+    one string pair per bit; bit, range and wildcard references are resolved
+    arithmetically. Single-bit ports map to the full target expression.
+    A port connected to a concatenation keeps its pieces as (lsb, width, net,
+    net lsb, scalar) runs from the port LSB up; scalar nets are named without
+    a select.
+    """
+    target: str
+    width: int = 1
+    lsb: int = 0
+    target_lsb: int = 0
+    whole_target: bool = True
+    pieces: tuple = ()
+
+    @property
+    def msb(self):
+        return self.lsb + self.width - 1
+
+    def covers(self, index):
+        return self.lsb <= index <= self.msb
+
+    def target_index(self, index):
+        return self.target_lsb + index - self.lsb
+
+    def bit(self, index):
+        if self.pieces:
+            return self.select_range(index, index)
+        return f"{self.target}[{self.target_index(index)}]"
+
+    def select_range(self, msb, lsb):
+        if self.pieces:
+            return ' '.join(self._piece_selects(min(msb, lsb), max(msb, lsb)))
+        return f"{self.target}[{self.target_index(msb)}:{self.target_index(lsb)}]"
+
+    def _piece_selects(self, lo, hi):
+        """References to port bits lo..hi of a concatenation, MSB first."""
+        refs = []
+        for piece_lsb, width, net, net_lsb, scalar in reversed(self.pieces):
+            first, last = max(lo, piece_lsb), min(hi, piece_lsb + width - 1)
+            if first > last:
+                continue
+            first, last = net_lsb + first - piece_lsb, net_lsb + last - piece_lsb
+            if scalar:
+                refs.append(net)
+            else:
+                refs.append(f"{net}[{first}]" if first == last else f"{net}[{last}:{first}]")
+        return refs
+
+    def runs(self):
+        """(lsb, width, net, net lsb) runs of the connected nets, from the port LSB up."""
+        if self.pieces:
+            return [piece[:4] for piece in self.pieces]
+        return [(self.lsb, self.width, self.target, self.target_lsb)]
+
+    def wildcard(self):
+        if self.whole_target:
+            return f"{self.target}[*]"
+        return self.select_range(self.msb, self.lsb)
+
+    @property
+    def target_base(self):
+        """Target signal name without a trailing bit select."""
+        if self.width > 1:
+            return self.target
+        return BIT_SUFFIX_RE.sub('', self.target)
+
+
+def build_port_map(mapping, source_ports, logger=None, mappings_file=None, net_ranges=None):
+    """
+    Build a PortMapping for every connected source port.
+    Honors the port LSB recorded by parse_verilog_ports and descending part-selects
+    in the connection (.din(bus[15:8])), so memory and lookups do not grow with width.
+    Concatenations (.din({hi, lo})) are sized with net_ranges, the target's
+    declared net ranges.
+    """
+    net_ranges = net_ranges or {}
+    port_map = {}
     if logger:
         logger.debug(f"Source ports found: {list(source_ports.keys())}")
     
@@ -195,111 +1303,483 @@ def expand_vector_signals(mapping, source_ports, logger=None, mappings_file=None
         mappings_output.append(mapping_line)
         if logger:
             logger.debug(f"Mapping: {port} -> {target_sig}")
-        if info['width'] == 1:
-            bit_map[port] = target_sig
+        if info.width == 1:
+            port_map[port] = PortMapping(target_sig)
+            continue
+
+        slices = _expression_slices(target_sig, net_ranges) if target_sig.startswith('{') else None
+        if slices:
+            pieces = []
+            offset = 0
+            for net, lo, width in slices:
+                width = min(width, info.width - offset)
+                if width <= 0:
+                    break
+                pieces.append((info.lsb + offset, width, net, lo, net_ranges.get(net, (0, 1)) == (lo, 1)))
+                offset += width
+            port_map[port] = PortMapping(target_sig, info.width, info.lsb, whole_target=False, pieces=tuple(pieces))
+            continue
+
+        part_select = PART_SELECT_RE.match(target_sig)
+        if part_select and int(part_select.group(2)) >= int(part_select.group(3)):
+            port_map[port] = PortMapping(part_select.group(1), info.width, info.lsb,
+                                         int(part_select.group(3)), whole_target=False)
         else:
-            for i in range(info['width']):
-                src_bit = f"{port}[{i}]"
-                tgt_bit = f"{target_sig}[{i}]"
-                bit_map[src_bit] = tgt_bit
+            port_map[port] = PortMapping(target_sig, info.width, info.lsb)
     
     # Write mappings to file
     if mappings_file and mappings_output:
-        with open(mappings_file, 'a') as f:
+        with open_file(mappings_file, 'a') as f:
             f.writelines(mappings_output)
     
+    return port_map
+
+def port_map_to_bit_map(port_map):
+    """Expand a port map to the per-bit string mapping used by the legacy engine."""
+    bit_map = {}
+    for port, port_mapping in port_map.items():
+        if port_mapping.width == 1:
+            bit_map[port] = port_mapping.target
+        else:
+            for i in range(port_mapping.lsb, port_mapping.msb + 1):
+                bit_map[f"{port}[{i}]"] = port_mapping.bit(i)
     return bit_map
 
-def analyze_signal_connectivity(target_rtl):
+def analyze_signal_connectivity(target_rtl, top=None):
     """
     Analyze signal connectivity to determine which internal signals
     connect to top-level inputs/outputs through wires or nets.
     Returns a set of signals that are connected to top-level I/O.
+    With top, only that module's definition is scanned.
     """
-    connected_signals = set()
+    if is_yosys_json(target_rtl):
+        return netlist_connectivity(target_rtl, top)[:3]
     top_level_ports = set()
     assign_map = {}  # Maps signals to what they're assigned from
-    
-    with open(target_rtl) as f:
-        content = f.read()
-        
-        # Extract top-level ports
-        port_matches = re.findall(r'(input|output|inout)\s*(?:reg\s*)?(?:\[[^\]]+\])?\s*(\w+)', content)
-        for _, port in port_matches:
-            top_level_ports.add(port)
-            connected_signals.add(port)
-        
-        # Find wire declarations and their connectivity
-        wire_matches = re.findall(r'wire\s*(?:\[[^\]]+\])?\s*(\w+)', content)
-        wires = {match for match in wire_matches}
-        
-        # Build assignment map first
-        assign_matches = re.findall(r'assign\s+(\w+(?:\[[^\]]*\])?)\s*=\s*([^;]+)', content)
-        for lhs, rhs in assign_matches:
-            lhs_sig = re.sub(r'\[[^\]]*\]', '', lhs)
-            rhs_signals = re.findall(r'\b(\w+)', rhs)
-            # For simple direct assignments, map the signal
-            if len(rhs_signals) == 1:
-                assign_map[lhs_sig] = rhs_signals[0]
-        
-        # Iteratively follow assign chains to find what connects to top-level ports
-        changed = True
-        while changed:
-            changed = False
-            for lhs, rhs in assign_matches:
-                lhs_sig = re.sub(r'\[[^\]]*\]', '', lhs)
-                rhs_signals = re.findall(r'\b(\w+)', rhs)
-                
-                # If LHS is connected to top-level, mark all RHS signals as connected
-                if lhs_sig in connected_signals:
-                    for sig in rhs_signals:
-                        if sig not in connected_signals:
-                            connected_signals.add(sig)
-                            changed = True
-                # If any RHS is connected to top-level, mark LHS as connected
-                elif any(sig in connected_signals for sig in rhs_signals):
-                    if lhs_sig not in connected_signals:
-                        connected_signals.add(lhs_sig)
-                        changed = True
-        
-        # Find instance connections that bridge signals
-        inst_pattern = r'(\w+)\s+(\w+)\s*\(([^)]+)\)'
-        instances = re.findall(inst_pattern, content, re.DOTALL)
-        
-        for module_name, inst_name, connections in instances:
-            conn_matches = re.findall(r'\.(\w+)\s*\(\s*([\w\[\]:]+)\s*\)', connections)
-            for port, signal in conn_matches:
-                signal_base = re.sub(r'\[[^\]]*\]', '', signal)
-                # If signal connects to a top-level port, mark it as connected
-                if signal_base in connected_signals:
-                    connected_signals.add(signal_base)
+    parent = {}  # Union-find forest over net names: every assign joins its LHS and RHS names
+
+    def find(sig):
+        root = parent.setdefault(sig, sig)
+        while root != parent[root]:
+            parent[root] = root = parent[parent[root]]
+        return root
+
+    region = _module_region(target_rtl, top)
+    # Extract top-level ports
+    port_matches = _scan_verilog(re.compile(rb'(input|output|inout)\s*(?:reg\s*)?(?:\[[^\]]+\])?\s*(\w+)'), *region)
+    for _, port in port_matches:
+        top_level_ports.add(port)
+
+    # One pass over the assigns builds the net graph; a net is connected when
+    # its component holds a top-level port, whichever side of an assign it is on
+    for lhs, rhs in _scan_verilog(re.compile(rb'assign\s+(\w+(?:\[[^\]]*\])?)\s*=\s*([^;]+)'), *region):
+        lhs_sig = re.sub(r'\[[^\]]*\]', '', lhs)
+        rhs_signals = re.findall(r'\b(\w+)', rhs)
+        # For simple direct assignments, map the signal
+        if len(rhs_signals) == 1:
+            assign_map[lhs_sig] = rhs_signals[0]
+        root = find(lhs_sig)
+        for sig in rhs_signals:
+            other = find(sig)
+            if other != root:
+                parent[other] = root
+
+    port_roots = {find(port) for port in top_level_ports}
+    connected_signals = {sig for sig in parent if find(sig) in port_roots}
+    connected_signals |= top_level_ports
     
     return connected_signals, assign_map, top_level_ports
 
-def trace_signal_to_top_port(signal, assign_map, top_level_ports):
+# Net declarations with an optional literal packed range, e.g. "input wire [7:0] a, b"
+NET_KEYWORDS = rb'(?:input|output|inout|wire|reg|logic|tri)'
+NET_DECL_RE = re.compile(
+    rb'\b(' + NET_KEYWORDS + rb')\b(?:\s+(?:wire|reg|logic|signed|unsigned)\b)*\s*'
+    rb'(?:\[([^\[\]:]+):([^\[\]]+)\])?\s*'
+    rb'((?:\\\S+|(?!' + NET_KEYWORDS + rb'\b)[A-Za-z_]\w*)'
+    rb'(?:\s*,\s*(?:\\\S+|(?!' + NET_KEYWORDS + rb'\b)[A-Za-z_]\w*))*)'
+)
+# A single net reference with an optional bit or part select
+NET_REF_RE = re.compile(r'^\s*(\\\S+|[A-Za-z_]\w*)\s*(?:\[\s*(\d+)\s*(?::\s*(\d+)\s*)?\])?\s*$')
+ASSIGN_RE = re.compile(rb'\bassign\s+([^=;]+?)\s*=\s*([^;]+);')
+# Identifiers used as operands in an expression (skips based literals like 8'hFF)
+EXPR_OPERAND_RE = re.compile(r"(?<![\w'$])(\\\S+|[A-Za-z_]\w*)")
+
+
+class BitConnectivity(NamedTuple):
     """
-    Trace a signal through assign statements to find the ultimate top-level port.
-    Returns the top-level port name, or the original signal if not connected to top-level.
+    Per-bit connectivity to top-level I/O.
+
+    masks maps each net to a Python int bitset where bit i is set when net[i]
+    reaches a top-level port; ranges maps declared nets to (lsb, width), and
+    ports holds the declared input/output/inout names.
     """
-    visited = set()
-    current = signal
-    
-    while current not in visited:
-        visited.add(current)
-        
-        # If we found a top-level port, return it
-        if current in top_level_ports:
-            return current
-            
-        # Follow the assignment chain
-        if current in assign_map:
-            current = assign_map[current]
+    masks: Dict[str, int]
+    ranges: Dict[str, Tuple[int, int]]
+    ports: Set[str] = frozenset()
+
+    def net_mask(self, net):
+        return self.masks.get(net, 0)
+
+
+def _net_slice(ref, ranges):
+    """Return (net, lsb, width) for a net reference, or None if it is not a plain reference."""
+    m = NET_REF_RE.match(ref)
+    if not m:
+        return None
+    net, msb, lsb = m.groups()
+    if msb is None:
+        decl_lsb, width = ranges.get(net, (0, 1))
+        return net, decl_lsb, width
+    if lsb is None:
+        return net, int(msb), 1
+    msb, lsb = int(msb), int(lsb)
+    return net, min(msb, lsb), abs(msb - lsb) + 1
+
+
+def _expression_slices(expr, ranges):
+    """
+    Split a reference or {a, b[3:0], ...} concatenation into bit slices ordered
+    from LSB upwards. Returns None for any other expression.
+    """
+    expr = expr.strip()
+    if expr.startswith('{') and expr.endswith('}'):
+        parts = expr[1:-1].split(',')
+        if any('{' in part or '}' in part for part in parts):
+            return None
+    else:
+        parts = [expr]
+    slices = []
+    for part in reversed(parts):
+        net_slice = _net_slice(part, ranges)
+        if net_slice is None:
+            return None
+        slices.append(net_slice)
+    return slices
+
+
+def _align_slices(lhs_slices, rhs_slices):
+    """Pair two LSB-first slice lists into bit-aligned (net_a, lo_a, net_b, lo_b, width) edges."""
+    edges = []
+    i = j = 0
+    offset_a = offset_b = 0
+    while i < len(lhs_slices) and j < len(rhs_slices):
+        net_a, lo_a, width_a = lhs_slices[i]
+        net_b, lo_b, width_b = rhs_slices[j]
+        width = min(width_a - offset_a, width_b - offset_b)
+        edges.append((net_a, lo_a + offset_a, net_b, lo_b + offset_b, width))
+        offset_a += width
+        offset_b += width
+        if offset_a == width_a:
+            i, offset_a = i + 1, 0
+        if offset_b == width_b:
+            j, offset_b = j + 1, 0
+    return edges
+
+
+def _declared_nets(region):
+    """
+    Return (ranges, ports) of a module region: net -> (lsb, width) for every
+    declared net with an evaluable range, and the input/output/inout names.
+    """
+    params = {name: value.strip() for name, value in _scan_verilog(PARAMETER_RE, *region)}
+    ranges = {}
+    ports = set()
+    for kind, msb, lsb, names in _scan_verilog(NET_DECL_RE, *region):
+        if msb:
+            try:
+                msb, lsb = _eval_const_expr(msb, params), _eval_const_expr(lsb, params)
+            except ValueError:
+                continue  # Unresolvable range; these nets fall back to name-level checks
+            lo, width = min(msb, lsb), abs(msb - lsb) + 1
         else:
-            # No more assignments to follow
-            break
-    
-    # If we couldn't trace to a top-level port, return original signal
-    return signal
+            lo, width = 0, 1
+        for name in names.split(','):
+            name = name.strip()
+            ranges[name] = (lo, width)
+            if kind in ('input', 'output', 'inout'):
+                ports.add(name)
+    return ranges, ports
+
+
+def analyze_bit_connectivity(target_rtl, top=None):
+    """
+    Compute per-bit connectivity of every net to top-level I/O.
+
+    Assignments between plain references, selects and concatenations propagate
+    bit-aligned; any other expression connects all bits of its operands to the
+    whole left-hand side, like analyze_signal_connectivity does per name.
+    Bitsets are Python ints, so propagation costs word operations rather than
+    per-bit work even on very wide buses. With top, only that module's
+    definition is scanned.
+    """
+    if is_yosys_json(target_rtl):
+        return netlist_connectivity(target_rtl, top)[3]
+    region = _module_region(target_rtl, top)
+    ranges, ports = _declared_nets(region)
+    masks = {}
+    for name in ports:
+        lo, width = ranges[name]
+        masks[name] = ((1 << width) - 1) << lo
+
+    # Edges are either bit-aligned (net_a, lo_a, net_b, lo_b, width) or coarse
+    # (None, lhs_slice, operand_nets) for expressions we do not model per bit
+    adjacency = {}
+    def add_edge(edge, nets):
+        for net in nets:
+            adjacency.setdefault(net, []).append(edge)
+
+    for lhs, rhs in _scan_verilog(ASSIGN_RE, *region):
+        lhs_slices = _expression_slices(lhs, ranges)
+        if not lhs_slices:
+            continue
+        rhs_slices = _expression_slices(rhs, ranges)
+        if rhs_slices is not None:
+            for edge in _align_slices(lhs_slices, rhs_slices):
+                add_edge(edge, {edge[0], edge[2]})
+        else:
+            operands = set(EXPR_OPERAND_RE.findall(rhs))
+            for net, lo, width in lhs_slices:
+                add_edge((None, (net, lo, width), operands), operands | {net})
+
+    # Worklist propagation: a net is revisited only when its bitset grows
+    pending = list(masks)
+    while pending:
+        net = pending.pop()
+        for edge in adjacency.get(net, ()):
+            updates = []
+            if edge[0] is None:
+                _, (lhs_net, lhs_lo, lhs_width), operands = edge
+                lhs_bits = ((1 << lhs_width) - 1) << lhs_lo
+                if masks.get(lhs_net, 0) & lhs_bits:
+                    for op in operands:
+                        op_lo, op_width = ranges.get(op, (0, 1))
+                        updates.append((op, ((1 << op_width) - 1) << op_lo))
+                if any(masks.get(op, 0) for op in operands):
+                    updates.append((lhs_net, lhs_bits))
+            else:
+                net_a, lo_a, net_b, lo_b, width = edge
+                window = (1 << width) - 1
+                updates.append((net_b, ((masks.get(net_a, 0) >> lo_a) & window) << lo_b))
+                updates.append((net_a, ((masks.get(net_b, 0) >> lo_b) & window) << lo_a))
+            for target, bits in updates:
+                current = masks.get(target, 0)
+                if bits & ~current:
+                    masks[target] = current | bits
+                    pending.append(target)
+
+    return BitConnectivity(masks, ranges, ports)
+
+@lru_cache(maxsize=None)
+def netlist_connectivity(path, module=None):
+    """
+    Connectivity of one module of a Yosys JSON netlist (default: its top), as
+    (connected_signals, assign_map, top_level_ports, BitConnectivity).
+
+    Nets sharing a bit share its net id, so assigns need no tracing; bits reach
+    I/O through combinational cells like operands of an assign expression do.
+    assign_map sends each net that is another name of a whole port to that port.
+    """
+    modules = read_netlist(path)
+    if module is None:
+        module = next((name for name, entry in modules.items() if entry.top), next(iter(modules), None))
+    netlist = modules[module]
+    reached = io_reach(netlist)
+    masks = {}
+    ranges = {}
+    for name, wire in netlist.nets.items():
+        ranges[name] = (wire.offset, len(wire.bits))
+        if reached.issuperset(wire.bits):
+            mask = ((1 << len(wire.bits)) - 1) << wire.offset
+        else:
+            mask = 0
+            for position, bit in enumerate(wire.bits):
+                if bit in reached:
+                    mask |= 1 << wire.index(position)
+        if mask:
+            masks[name] = mask
+    top_level_ports = set(netlist.ports)
+    port_bits = {wire.bits: port for port, (_, wire) in netlist.ports.items() if wire.bits}
+    assign_map = {name: port_bits[wire.bits] for name, wire in netlist.nets.items()
+                  if name not in top_level_ports and wire.bits in port_bits}
+    return set(masks) | top_level_ports, assign_map, top_level_ports, BitConnectivity(masks, ranges, top_level_ports)
+
+class AssignTrace:
+    """
+    Bit-level trace of a module's connections to the top-level port bits they
+    are another name for.
+
+    Every net bit gets an integer id (a net takes consecutive ids from its
+    declared LSB), and assigns between plain references, selects and
+    concatenations join bits in a union-find forest with path compression, so
+    a trace costs amortized O(1) per bit however long the assign chains are
+    and in whichever direction they run. When several ports share a class,
+    the first declared port names it.
+    """
+
+    def __init__(self, ranges, ports):
+        self.ranges = ranges
+        self.ports = ports
+        self.bases = {}  # net -> id of its declared LSB
+        self.parent = array('q')
+        self.port_roots = None  # class root -> (port, index); built on the first trace
+
+    def _id(self, net, index):
+        lo, width = self.ranges.get(net, (0, 1))
+        if not lo <= index < lo + width:
+            return None
+        base = self.bases.get(net)
+        if base is None:
+            base = self.bases[net] = len(self.parent)
+            self.parent.extend(range(base, base + width))
+        return base + index - lo
+
+    def _find(self, node):
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def join(self, net_a, lo_a, net_b, lo_b, width):
+        """Record that width bits of net_a from lo_a are another name for those of net_b from lo_b."""
+        decl_a, width_a = self.ranges.get(net_a, (0, 1))
+        decl_b, width_b = self.ranges.get(net_b, (0, 1))
+        # Clip to the bits both nets declare, then walk consecutive ids
+        first = max(0, decl_a - lo_a, decl_b - lo_b)
+        last = min(width, decl_a + width_a - lo_a, decl_b + width_b - lo_b)
+        if first >= last:
+            return
+        a = self._id(net_a, lo_a + first) - first
+        b = self._id(net_b, lo_b + first) - first
+        find, parent = self._find, self.parent
+        for offset in range(first, last):
+            root_a, root_b = find(a + offset), find(b + offset)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def _port_bit(self, node):
+        if self.port_roots is None:
+            self.port_roots = {}
+            for port in [net for net in self.ranges if net in self.ports and net in self.bases]:
+                lo, width = self.ranges[port]
+                for index in range(lo, lo + width):
+                    self.port_roots.setdefault(self._find(self._id(port, index)), (port, index))
+        return self.port_roots.get(self._find(node))
+
+    def port_runs(self, net, lo, width):
+        """
+        (lsb, width, port, port lsb) runs of the bits of net[lo +: width] that
+        are top-level port bits under another name, LSB first; other bits are
+        left out.
+        """
+        if net in self.ports:
+            return [(lo, width, net, lo)]
+        if net not in self.bases:
+            return []
+        decl_lo, decl_width = self.ranges.get(net, (0, 1))
+        runs = []
+        for index in range(max(lo, decl_lo), min(lo + width, decl_lo + decl_width)):
+            port_bit = self._port_bit(self._id(net, index))
+            if port_bit is None:
+                continue
+            port, port_index = port_bit
+            last = runs[-1] if runs else None
+            if last and last[2] == port and (last[0] + last[1], last[3] + last[1]) == (index, port_index):
+                last[1] += 1
+            else:
+                runs.append([index, 1, port, port_index])
+        return [tuple(run) for run in runs]
+
+    def slices(self, expr):
+        """
+        Split a connection expression into (net, lsb, width) slices from the LSB
+        up: top-level port slices for the traced bits and slices of the nets as
+        written for the rest. Returns None for expressions that are not
+        references or concatenations.
+        """
+        parts = _expression_slices(expr, self.ranges)
+        if parts is None:
+            return None
+        pieces = []
+
+        def add(net, lo, width):
+            if pieces and pieces[-1][0] == net and pieces[-1][1] + pieces[-1][2] == lo:
+                pieces[-1][2] += width
+            else:
+                pieces.append([net, lo, width])
+
+        for net, lo, width in parts:
+            covered = lo
+            for run_lo, run_width, port, port_lo in self.port_runs(net, lo, width):
+                if run_lo > covered:
+                    add(net, covered, run_lo - covered)
+                add(port, port_lo, run_width)
+                covered = run_lo + run_width
+            if covered < lo + width:
+                add(net, covered, lo + width - covered)
+        return [tuple(piece) for piece in pieces]
+
+    def _spell(self, net, lo, width):
+        if (lo, width) == self.ranges.get(net, (0, 1)):
+            return net
+        return f"{net}[{lo}]" if width == 1 else f"{net}[{lo + width - 1}:{lo}]"
+
+    def trace(self, expr):
+        """
+        Respell a connection expression on the top-level port bits it carries:
+        one port slice, or a concatenation when the bits land on several slices
+        or only some of them reach a port. Expressions with no traced bit are
+        returned as written.
+        """
+        pieces = self.slices(expr)
+        if pieces is None or pieces == _expression_slices(expr, self.ranges):
+            return expr
+        refs = [self._spell(*piece) for piece in reversed(pieces)]
+        return refs[0] if len(refs) == 1 else '{' + ', '.join(refs) + '}'
+
+
+@lru_cache(maxsize=None)
+def trace_assigns(target_rtl, top=None):
+    """
+    Build the AssignTrace of a module (default: the whole file). For a Yosys
+    JSON netlist every named net is traced to the port bits it shares.
+    """
+    if is_yosys_json(target_rtl):
+        return netlist_trace(target_rtl, top)
+    region = _module_region(target_rtl, top)
+    trace = AssignTrace(*_declared_nets(region))
+    for lhs, rhs in _scan_verilog(ASSIGN_RE, *region):
+        lhs_slices = _expression_slices(lhs, trace.ranges)
+        rhs_slices = _expression_slices(rhs, trace.ranges)
+        if lhs_slices and rhs_slices:
+            for edge in _align_slices(lhs_slices, rhs_slices):
+                trace.join(*edge)
+    return trace
+
+
+def netlist_trace(path, module=None):
+    """AssignTrace of one module of a Yosys JSON netlist (default: its top), joining nets that share net ids."""
+    modules = read_netlist(path)
+    if module is None:
+        module = next((name for name, entry in modules.items() if entry.top), next(iter(modules), None))
+    netlist = modules[module]
+    wires = {port: wire for port, (_, wire) in netlist.ports.items()}  # ports first, so earlier ports win
+    for name, wire in netlist.nets.items():
+        wires.setdefault(name, wire)
+    trace = AssignTrace({name: (wire.offset, len(wire.bits)) for name, wire in wires.items()}, set(netlist.ports))
+    first = {}  # net id -> (net, index) of its first name
+    for name, wire in wires.items():
+        for position, bit in enumerate(wire.bits):
+            if not isinstance(bit, int):
+                continue
+            index = wire.index(position)
+            if bit in first:
+                trace.join(name, index, *first[bit], 1)
+            else:
+                first[bit] = (name, index)
+    return trace
 
 def promote_hierarchical_paths(line, instance_name, logger=None):
     """
@@ -377,138 +1857,1026 @@ def promote_hierarchical_paths(line, instance_name, logger=None):
     
     return promoted_line
 
-def parse_sdc(sdc_file):
+def follow_sdc_sources(commands, logger=None, reported=None):
+    """
+    Promote the constraints of files an SDC reads through source/read_sdc in
+    place of the directive (see expand_sources). Directives that cannot be
+    followed are passed on for the promotion handlers to ignore, and reported
+    once per location. reported is the set of (file, line) locations already
+    reported; a run shares one so IPs and instances reading the same file
+    report it once.
+    """
+    reported = set() if reported is None else reported
+    for command in expand_sources(commands):
+        if logger and command.name in SOURCE_COMMANDS:
+            location = (command.location.file, command.location.line)
+            if location not in reported:
+                reported.add(location)
+                reason = '; '.join(command.errors) or "file name computed by Tcl"
+                logger.warning(f"{command.location.file}:{command.location.line}: {reason}, "
+                               f"{command.name} not promoted")
+        yield command
+
+def format_constraint_line(line):
+    """
+    Format a constraint line with proper indentation and line breaks for readability.
+    Avoids extremely wide lines by breaking at logical points.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return line + '\n'
+    
+    # Define maximum line length before breaking
+    MAX_LINE_LENGTH = 120
+    
+    if len(line) <= MAX_LINE_LENGTH:
+        return line + '\n'
+    
+    # For multi-argument constraints, try to break intelligently
+    formatted_line = ""
+    
+    # Check if this is a constraint with -from/-to/-through arguments
+    if any(arg in line for arg in ['-from', '-to', '-through']):
+        # Break into logical sections
+        sections = []
+        current_section = ""
+        
+        # Split by constraint arguments but keep the argument with its content
+        parts = re.split(r'(\s+-(?:from|to|through|setup|hold|max|min|clock)\s+)', line)
+        
+        for i, part in enumerate(parts):
+            if i == 0:  # First part (constraint name)
+                current_section = part
+            elif part.strip().startswith('-'):  # Argument flag
+                if current_section:
+                    sections.append(current_section)
+                current_section = "    " + part.strip() + " "  # Indent arguments, keep the value apart
+            else:  # Argument value
+                current_section += part
+        
+        if current_section:
+            sections.append(current_section)
+        
+        # Join sections with line continuations
+        if len(sections) > 1:
+            formatted_line = sections[0] + " \\\n"
+            for section in sections[1:-1]:
+                formatted_line += section + " \\\n"
+            formatted_line += sections[-1] + "\n"
+        else:
+            formatted_line = line + "\n"
+    
+    # For constraints with long get_ports/get_pins lists, try to break at logical points
+    elif any(cmd in line for cmd in ['get_ports', 'get_pins', 'get_nets', 'get_clocks']):
+        # Look for curly brace content that's very long
+        brace_match = re.search(r'\{([^}]+)\}', line)
+        if brace_match and len(brace_match.group(0)) > 80:
+            content = brace_match.group(1)
+            signals = [s.strip() for s in content.split() if s.strip()]
+            
+            if len(signals) > 3:  # Only break if more than 3 signals
+                # Group signals by 3-4 per line
+                signal_groups = []
+                for i in range(0, len(signals), 4):
+                    signal_groups.append(' '.join(signals[i:i+4]))
+                
+                # Find the position of the opening brace
+                before_brace = line[:line.find('{')]
+                after_brace = line[line.find('}') + 1:]
+                
+                formatted_line = before_brace + "{ \\\n"
+                for i, group in enumerate(signal_groups):
+                    if i == len(signal_groups) - 1:  # Last group
+                        formatted_line += "        " + group + " \\\n"
+                        formatted_line += "    }" + after_brace + "\n"
+                    else:
+                        formatted_line += "        " + group + " \\\n"
+            else:
+                formatted_line = line + "\n"
+        else:
+            formatted_line = line + "\n"
+    
+    else:
+        # For other long lines, try simple breaking at logical points
+        if len(line) > MAX_LINE_LENGTH:
+            # Try to break at spaces near logical points
+            if ' -' in line:
+                parts = line.split(' -')
+                formatted_line = parts[0] + " \\\n"
+                for part in parts[1:]:
+                    formatted_line += "    -" + part + " \\\n"
+                formatted_line = formatted_line.rstrip(' \\\n') + "\n"
+            else:
+                formatted_line = line + "\n"
+        else:
+            formatted_line = line + "\n"
+    
+    return formatted_line
+
+# Object-name tokens in SDC text: an escaped identifier (optionally carrying bracket
+# groups that are part of the name), or an identifier run with an optional
+# bit, range or wildcard select directly attached to it.
+SDC_OBJECT_TOKEN_RE = re.compile(
+    r'(\\[^\s{}\[\]]+(?:\[[^\s{}\[\]]*\])*)'
+    r'|(\w+)(\[(?:\d+(?::\d+)?|\*)\])?'
+)
+SDC_WORD_RE = re.compile(r'\w+')
+SDC_RANGE_RE = re.compile(r'\[\d+:\d+\]')
+SDC_BRACED_RE = re.compile(r'\{[^}]+\}')
+SDC_GET_OBJECT_PREFIX_RE = re.compile(r'(?:get_ports|get_pins|get_nets)\s+$')
+# Trailing [n], [msb:lsb] or [*] select of an object name, e.g. the [*] of data*[*]
+TRAILING_SELECT_RE = re.compile(r'\[(?:\d+(?::\d+)?|\*)\]$')
+# One object of a collection argument
+GLOB_ITEM_RE = re.compile(r'[^\s{}]+')
+
+
+@lru_cache(maxsize=4096)
+def compile_sdc_glob(pattern):
+    """
+    Compile an SDC/Tcl glob object pattern. Returns (literal_prefix, regex, split),
+    where split is the offset in pattern of the first wildcard.
+
+    '*' and '?' are wildcards and a backslash escapes the next character, except
+    a leading backslash, which starts an escaped identifier and is part of the
+    name. Brackets are literal because SDC names use them for bit selects.
+    regex is None when the pattern has no wildcard.
+    """
+    parts = []
+    prefix = None
+    pos = 1 if pattern.startswith('\\') else 0
+    literal = pattern[:pos]
+    while pos < len(pattern):
+        ch = pattern[pos]
+        if ch == '\\' and pos + 1 < len(pattern):
+            literal += pattern[pos + 1]
+            pos += 2
+            continue
+        if ch in '*?':
+            if prefix is None:
+                prefix, split = literal, pos
+            parts.append(re.escape(literal))
+            parts.append('.*' if ch == '*' else '.')
+            literal = ''
+        else:
+            literal += ch
+        pos += 1
+    if prefix is None:
+        return literal, None, len(pattern)
+    parts.append(re.escape(literal))
+    return prefix, re.compile(''.join(parts), re.S), split
+
+
+def is_sdc_glob(name):
+    """True when an object name carries a '*' or '?' wildcard outside a trailing [*] select."""
+    return compile_sdc_glob(TRAILING_SELECT_RE.sub('', name))[1] is not None
+
+
+def match_sdc_glob(pattern, names):
+    """
+    Return the entries of the sorted sequence names matched by a glob pattern.
+    Only names sharing the pattern's literal prefix are tested.
+    """
+    prefix, regex, _ = compile_sdc_glob(pattern)
+    lo = bisect_left(names, prefix)
+    hi = bisect_left(names, prefix + '\U0010ffff') if prefix else len(names)
+    if regex is None:
+        return [name for name in names[lo:hi] if name == prefix]
+    return [name for name in names[lo:hi] if regex.fullmatch(name)]
+
+
+class RewriteIndex(NamedTuple):
+    """
+    Hash lookups used by the token rewrite engine for one instance. port_names
+    and top_ports are sorted so glob patterns only scan their literal prefix.
+    """
+    ports: Dict[str, PortMapping]
+    port_names: Tuple[str, ...] = ()
+    top_ports: Tuple[str, ...] = ()
+
+
+def build_rewrite_index(port_map, top_ports=()):
+    """
+    Build the lookup tables for rewrite_line_tokens from a port map. top_ports
+    (the target's port names) lets glob collections collapse to one top-level pattern.
+    """
+    return RewriteIndex(port_map, tuple(sorted(port_map)), tuple(sorted(top_ports)))
+
+
+def _whole_port_target(port_mapping):
+    """Top-level expression for all bits of a source port."""
+    if port_mapping.width == 1 or port_mapping.whole_target:
+        return port_mapping.target
+    return port_mapping.select_range(port_mapping.msb, port_mapping.lsb)
+
+
+def _resolve_glob_token(pattern, in_brace, index):
+    """
+    Resolve a wildcard get_ports object against the IP's port names.
+
+    When every matched port maps to a whole top-level port under one common
+    renaming of the pattern's literal prefix, and the renamed pattern matches
+    exactly those ports at the top, the pattern itself is promoted. Otherwise
+    the matches are expanded to an explicit list of top-level references.
+    Returns None when nothing matches.
+    """
+    select_match = TRAILING_SELECT_RE.search(pattern)
+    select = select_match.group(0) if select_match else None
+    base = pattern[:select_match.start()] if select_match else pattern
+    matches = match_sdc_glob(base, index.port_names)
+    if not matches:
+        return None
+
+    mappings = [index.ports[name] for name in matches]
+    if select is None or select == '[*]':
+        prefix, _, split = compile_sdc_glob(base)
+        targets = set()
+        renamed = None
+        for name, port_mapping in zip(matches, mappings):
+            target = port_mapping.target
+            tail = name[len(prefix):]
+            plain = port_mapping.whole_target if port_mapping.width > 1 else BIT_SUFFIX_RE.search(target) is None
+            if not plain or not target.endswith(tail) or (select and port_mapping.width == 1):
+                renamed = None
+                break
+            head = target[:len(target) - len(tail)]
+            if renamed not in (None, head):
+                renamed = None
+                break
+            renamed = head
+            targets.add(target)
+        if renamed is not None:
+            candidate = renamed + base[split:]
+            if set(match_sdc_glob(candidate, index.top_ports)) == targets:
+                return candidate + (select or '')
+
+    expressions = []
+    for port_mapping in mappings:
+        if select is None:
+            expressions.append(_whole_port_target(port_mapping))
+        elif port_mapping.width == 1:
+            expressions.append(port_mapping.target_base + select if select == '[*]' or ':' in select
+                               else port_mapping.target + select)
+        elif select == '[*]':
+            expressions.append(port_mapping.wildcard())
+        else:
+            msb, _, lsb = select[1:-1].partition(':')
+            if port_mapping.covers(int(msb)) and (not lsb or port_mapping.covers(int(lsb))):
+                expressions.append(_resolve_select(port_mapping, select))
+    expressions = list(dict.fromkeys(expressions))
+    if not expressions:
+        return None
+    if len(expressions) == 1 or in_brace:
+        return ' '.join(expressions)
+    return '{' + ' '.join(expressions) + '}'
+
+
+def _object_list(expression, in_brace):
+    """Brace a multi-object expression unless it already sits in a brace group."""
+    if in_brace or ' ' not in expression:
+        return expression
+    return '{' + expression + '}'
+
+
+def _resolve_select(port_mapping, select):
+    """Resolve a [n], [msb:lsb] or [*] select on a vector port mapping."""
+    if select == '[*]':
+        return port_mapping.wildcard()
+    msb, _, lsb = select[1:-1].partition(':')
+    if lsb:
+        return port_mapping.select_range(int(msb), int(lsb))
+    return port_mapping.bit(int(msb))
+
+
+def _resolve_word_token(word, select, next_char, in_brace, exact_braced, select_form, index):
+    """Resolve one identifier token (plus its attached select) against the index."""
+    port_mapping = index.ports.get(word)
+    if port_mapping is None:
+        return None
+
+    if port_mapping.width == 1:
+        if select and (select == '[*]' or ':' in select):
+            return port_mapping.target_base + select
+        return port_mapping.target + (select or '')
+
+    if not select:
+        return None
+    if select == '[*]' or ':' in select:
+        return _object_list(_resolve_select(port_mapping, select), in_brace)
+    # Single bits resolve inside brace groups, or by base name for {name[n]}
+    if (in_brace and port_mapping.covers(int(select[1:-1]))) or (exact_braced and not select_form):
+        return _resolve_select(port_mapping, select)
+    return None
+
+
+def _resolve_escaped_token(token, line, start, in_brace, exact_braced, select_form, index):
+    """Resolve an escaped identifier token against the index."""
+    port_mapping = index.ports.get(token)
+    if port_mapping is not None and port_mapping.width == 1:
+        if exact_braced or (in_brace and '[' in token):
+            return port_mapping.target
+        if SDC_GET_OBJECT_PREFIX_RE.search(line, 0, start):
+            return port_mapping.target
+    elif port_mapping is not None and '[' in token:
+        # Escaped vector ports named with their own range, e.g. \bus/data[31:0]
+        if exact_braced or SDC_GET_OBJECT_PREFIX_RE.search(line, 0, start):
+            return _object_list(port_mapping.wildcard(), in_brace)
+
+    select_match = TRAILING_SELECT_RE.search(token)
+    if select_match:
+        port_mapping = index.ports.get(token[:select_match.start()])
+        select = select_match.group(0)
+        if port_mapping is not None and port_mapping.width > 1:
+            if select == '[*]' or ':' in select:
+                if exact_braced:
+                    return _resolve_select(port_mapping, select)
+            elif ((in_brace and port_mapping.covers(int(select[1:-1]))) or
+                  (exact_braced and not select_form)):
+                return _resolve_select(port_mapping, select)
+
+    # Identifier runs inside the escaped name still resolve as plain words
+    def resolve_inner(match):
+        inner_mapping = index.ports.get(match.group(0))
+        if inner_mapping is not None and inner_mapping.width == 1:
+            return inner_mapping.target
+        return match.group(0)
+    inner = SDC_WORD_RE.sub(resolve_inner, token)
+    return inner if inner != token else None
+
+
+def prefix_braced_words(line, instance_name):
+    """
+    Prefix hierarchical paths inside brace groups that are glued to an identifier
+    (e.g. path/{sub/pin}) with the instance name, collapsing whitespace.
+    """
+    processed_words = []
+    for word in line.split():
+        if ('/' in word and
+            re.match(r'[a-zA-Z\\]', word) and
+            not word.startswith(f'{instance_name}/') and
+            not word.startswith('[') and
+            not word.startswith('-') and
+            '{' in word and '}' in word):
+            content_match = re.search(r'\{([^}]+)\}', word)
+            if content_match:
+                content = content_match.group(1).strip()
+                prefixed_parts = []
+                for part in content.split():
+                    if ('/' in part and
+                        re.match(r'[a-zA-Z\\]', part) and
+                        not part.startswith(f'{instance_name}/')):
+                        prefixed_parts.append(f'{instance_name}/{part}')
+                    else:
+                        prefixed_parts.append(part)
+                word = word.replace(content, ' '.join(prefixed_parts))
+        processed_words.append(word)
+    return ' '.join(processed_words)
+
+
+class TokenSlot(NamedTuple):
+    """One object-name token of an SDC line and the context the resolvers need."""
+    start: int
+    end: int
+    escaped: Optional[str]
+    word: Optional[str]
+    select: Optional[str]
+    next_char: str
+    in_brace: bool
+    exact_braced: bool
+    glob: Optional[str] = None
+
+
+def scan_object_tokens(line, command=None):
+    """
+    Tokenize the object names of one SDC line. Returns (select_form, slots).
+
+    The scan depends only on the line text, so compiled templates reuse it for
+    every instance of the same IP. command is the lexed line, if already known.
+    """
+    # Lines carrying [*] or [msb:lsb] selects take the select-aware path, which
+    # keeps the original spacing and skips the bare 'name*' wildcard rewrite.
+    select_form = '[*]' in line or SDC_RANGE_RE.search(line) is not None
+    brace_spans = [m.span() for m in SDC_BRACED_RE.finditer(line)] if '{' in line else []
+    span_idx = 0
+
+    # Wildcard objects of get_ports collections are resolved whole by the glob engine
+    globs = []
+    if '*' in line or '?' in line:
+        for collection in get_ports_collections(command or lex_command(line)):
+            for item in GLOB_ITEM_RE.finditer(line, collection.start + len('[get_ports'), collection.end - 1):
+                if is_sdc_glob(item.group(0)):
+                    globs.append(item.span())
+    glob_idx = 0
+
+    slots = []
+    for m in SDC_OBJECT_TOKEN_RE.finditer(line):
+        start, end = m.span()
+        while glob_idx < len(globs) and globs[glob_idx][1] <= start:
+            glob_idx += 1
+        if glob_idx < len(globs) and globs[glob_idx][0] <= start:
+            continue
+        while span_idx < len(brace_spans) and brace_spans[span_idx][1] <= start:
+            span_idx += 1
+        in_brace = span_idx < len(brace_spans) and brace_spans[span_idx][0] < start
+        exact_braced = (start > 0 and line[start - 1] == '{' and
+                        end < len(line) and line[end] == '}')
+        escaped, word, select = m.groups()
+        next_char = line[end] if end < len(line) else ''
+        slots.append(TokenSlot(start, end, escaped, word, select, next_char, in_brace, exact_braced))
+    if globs:
+        for start, end in globs:
+            in_brace = any(lo < start < hi for lo, hi in brace_spans)
+            slots.append(TokenSlot(start, end, None, None, None, line[end:end + 1], in_brace,
+                                   line[start - 1:start] == '{' and line[end:end + 1] == '}', line[start:end]))
+        slots.sort(key=lambda slot: slot.start)
+    return select_form, tuple(slots)
+
+
+def render_object_tokens(line, select_form, slots, index, instance_name):
+    """Resolve pre-scanned token slots against the index and rebuild the line."""
+    pieces = []
+    pos = 0
+    for slot in slots:
+        if slot.glob is not None:
+            replacement = _resolve_glob_token(slot.glob, slot.in_brace, index)
+        elif slot.escaped:
+            replacement = _resolve_escaped_token(slot.escaped, line, slot.start, slot.in_brace,
+                                                 slot.exact_braced, select_form, index)
+        else:
+            replacement = _resolve_word_token(slot.word, slot.select, slot.next_char, slot.in_brace,
+                                              slot.exact_braced, select_form, index)
+
+        if replacement is not None:
+            pieces.append(line[pos:slot.start])
+            pieces.append(replacement)
+            pos = slot.end
+
+    if pos == 0:
+        promoted_line = line
+    else:
+        pieces.append(line[pos:])
+        promoted_line = ''.join(pieces)
+
+    if not select_form:
+        if '{' in promoted_line and '/' in promoted_line:
+            promoted_line = prefix_braced_words(promoted_line, instance_name)
+        else:
+            promoted_line = ' '.join(promoted_line.split())
+    return promoted_line
+
+
+def rewrite_line_tokens(line, index, instance_name):
+    """
+    Rewrite the object names of one SDC line in a single tokenizing pass.
+
+    Every identifier token is resolved with hash lookups against the RewriteIndex
+    instead of running one regex substitution per mapped bit. The context rules
+    (brace groups, get_* arguments, select/wildcard forms) follow the legacy engine
+    so both produce the same output for whole object names.
+    """
+    select_form, slots = scan_object_tokens(line)
+    return render_object_tokens(line, select_form, slots, index, instance_name)
+
+
+def is_delay_connected(line, port_map, connected_signals):
+    """
+    Check whether an input/output delay line targets ports that reach top-level I/O.
+    Lines without a get_ports collection are treated as connected.
+    """
+    port_match = re.search(r'\[get_ports\s+(.+?)\](?:\s|$)', line)
+    if not port_match:
+        return True
+
+    ports_str = port_match.group(1)
+    if ports_str.startswith('{') and ports_str.endswith('}'):
+        ports = re.findall(r'[\w\[\]:*]+', ports_str[1:-1].strip())
+    else:
+        ports = re.findall(r'[\w\[\]:*]+', ports_str)
+
+    for port in ports:
+        port_base = re.sub(r'\[[^\]]*\]', '', port)
+        port_mapping = port_map.get(port_base)
+        target_signal = port_mapping.target_base if port_mapping is not None else port_base
+        if port_base in connected_signals or target_signal in connected_signals:
+            return True
+    return False
+
+
+def get_ports_collections(command):
+    """Return the [get_ports ...] collections of a lexed command."""
+    return [collection for collection in command.collections if collection.command == 'get_ports']
+
+
+def _collection_words(collection):
+    """Options and objects of a collection, in the order they are written back."""
+    return list(collection.options) + list(collection.objects)
+
+
+# Leading character of a path that is relative to the IP (not a wildcard or option)
+OBJECT_PATH_START_RE = re.compile(r'[a-zA-Z_\\]')
+# A command nested in a collection argument, e.g. -of_objects [get_cells u0]
+NESTED_COMMAND_RE = re.compile(r'\[\s*[A-Za-z_]\w*\s')
+
+
+@lru_cache(maxsize=1 << 16)
+def prefix_object_path(path, instance_name):
+    """Prefix an IP-internal hierarchical path (sub/reg/Q) with the instance name."""
+    if '/' in path and not path.startswith('*/') and OBJECT_PATH_START_RE.match(path):
+        return f"{instance_name}/{path}"
+    return path
+
+
+def promote_object_paths(line, instance_name, hierarchy=None, unresolved=None, logger=None):
+    """
+    Prefix the hierarchical paths of every [get_pins ...] and [get_nets ...]
+    collection with the instance name, dropping repeated objects.
+
+    Collections come from the SDC lexer, so selects like
+    reg[1]/Q stay intact. With a HierarchyIndex each prefixed path is also looked
+    up in the target hierarchy; paths that do not resolve are still emitted but
+    recorded in the unresolved dict (path -> line) for review. Nested commands
+    (e.g. -of_objects [get_cells ...]) are left untouched.
+    """
+    if not instance_name or ('[get_pins' not in line and '[get_nets' not in line):
+        return line
+
+    collections = lex_command(line).collections
+    replacements = []
+    for command in ('get_pins', 'get_nets'):
+        for collection in collections:
+            if collection.command != command or NESTED_COMMAND_RE.search(line, collection.start + 1, collection.end):
+                continue
+            items = []
+            for item in _collection_words(collection):
+                if hierarchy is not None and not item.startswith('-'):
+                    item, resolved = hierarchy.promote(item, instance_name, command == 'get_pins')
+                    if not resolved and unresolved is not None:
+                        unresolved.setdefault(item, line)
+                elif not item.startswith('-'):
+                    item = prefix_object_path(item, instance_name)
+                items.append(item)
+            items = list(dict.fromkeys(items))
+            content = '{' + ' '.join(items) + '}' if collection.braced else ' '.join(items)
+            replacements.append((collection.start, collection.end, f"[{command} {content}]"))
+
+    promoted_line = line
+    for start, end, text in sorted(replacements, reverse=True):
+        promoted_line = promoted_line[:start] + text + promoted_line[end:]
+
+    if logger and promoted_line != line:
+        logger.info("Hierarchical path promotion applied")
+        logger.debug(f"Original: {line.strip()}")
+        logger.debug(f"Promoted: {promoted_line.strip()}")
+    return promoted_line
+
+
+def _bit_runs(bits, width):
+    """Yield (offset, length, is_set) runs of a width-bit integer, LSB first."""
+    offset = 0
+    while offset < width:
+        shifted = bits >> offset
+        is_set = bool(shifted & 1)
+        run = shifted if is_set else ~shifted
+        # Trailing ones of run == trailing zeros of ~run
+        length = ((~run) & -(~run)).bit_length() - 1
+        if length <= 0 or offset + length > width:
+            length = width - offset
+        yield offset, length, is_set
+        offset += length
+
+
+def _item_is_connected(name, port_map, bit_connectivity, connected_signals):
+    """Name-level connectivity check for collection items that are not mapped port bits."""
+    base = re.sub(r'\[[^\]]*\]', '', name).strip()
+    port_mapping = port_map.get(base)
+    target = port_mapping.target_base if port_mapping is not None else base
+    return (base in connected_signals or target in connected_signals or
+            bit_connectivity.net_mask(target) != 0)
+
+
+def _split_port_item(item, port_map, bit_connectivity, connected_signals):
+    """
+    Split one get_ports item into the references whose bits are top-level port
+    bits and the rest. Bits connected to internal nets count as unconnected even
+    when logic links the net to I/O, so no get_ports ends up naming a net.
+    Returns (connected_items, unconnected_items).
+    """
+    name, select = item, None
+    if item not in port_map:
+        select_match = TRAILING_SELECT_RE.search(item)
+        if select_match:
+            name, select = item[:select_match.start()].rstrip(), select_match.group(0)
+    port_mapping = port_map.get(name)
+
+    if port_mapping is None:
+        if _item_is_connected(item, port_map, bit_connectivity, connected_signals):
+            return [item], []
+        return [], [item]
+
+    if port_mapping.width == 1:
+        target = NET_REF_RE.match(port_mapping.target)
+        connected = False
+        if target and target.group(1) in bit_connectivity.ports:
+            net, bit = target.group(1), target.group(2)
+            mask = bit_connectivity.net_mask(net)
+            connected = (mask >> int(bit)) & 1 if bit is not None and target.group(3) is None else mask
+        return ([item], []) if connected else ([], [item])
+
+    # Source bit range referenced by the item
+    lo, hi = port_mapping.lsb, port_mapping.msb
+    if select and select != '[*]':
+        msb, _, lsb = select[1:-1].partition(':')
+        lo, hi = (int(msb), int(msb)) if not lsb else (min(int(msb), int(lsb)), max(int(msb), int(lsb)))
+        lo, hi = max(lo, port_mapping.lsb), min(hi, port_mapping.msb)
+        if lo > hi:
+            return [], [item]
+
+    width = hi - lo + 1
+    window = 0
+    for run_lsb, run_width, net, net_lsb in port_mapping.runs():
+        first, last = max(lo, run_lsb), min(hi, run_lsb + run_width - 1)
+        if first <= last and net in bit_connectivity.ports:
+            bits = bit_connectivity.net_mask(net) >> (net_lsb + first - run_lsb)
+            window |= (bits & ((1 << (last - first + 1)) - 1)) << (first - lo)
+    if window == (1 << width) - 1:
+        return [item], []
+    if window == 0:
+        return [], [item]
+    if name.startswith('\\'):
+        # Escaped names cannot be narrowed; they stay whole when every connected net is a port
+        if all(net in bit_connectivity.ports for _, _, net, _ in port_mapping.runs()):
+            return [item], []
+        return [], [item]
+
+    connected_items, unconnected_items = [], []
+    for offset, length, is_set in _bit_runs(window, width):
+        run_lo, run_hi = lo + offset, lo + offset + length - 1
+        ref = f"{name}[{run_lo}]" if run_lo == run_hi else f"{name}[{run_hi}:{run_lo}]"
+        (connected_items if is_set else unconnected_items).append(ref)
+    return connected_items, unconnected_items
+
+
+def split_delay_by_connectivity(line, port_map, bit_connectivity, connected_signals, collection=False):
+    """
+    Split an input/output delay line by per-bit connectivity to top-level I/O.
+
+    Returns (promote_line, ignored_line); either may be None. Partially connected
+    buses are narrowed to exactly the connected bit ranges, and the remaining bits
+    are returned as the ignored part. The line's first get_ports ObjectCollection
+    may be passed as collection if it is already known.
+    """
+    if collection is False:
+        collection = next(iter(get_ports_collections(lex_command(line))), None)
+    if collection is None:
+        return line, None
+    start, end = collection.start, collection.end
+
+    connected_items, unconnected_items = [], []
+    port_names = None
+    for item in collection.objects:
+        if is_sdc_glob(item):
+            # Wildcards are judged by the ports they match and kept whole unless split
+            if port_names is None:
+                port_names = sorted(port_map)
+            select_match = TRAILING_SELECT_RE.search(item)
+            select = select_match.group(0) if select_match else ''
+            matched = match_sdc_glob(item[:len(item) - len(select)], port_names)
+            connected, unconnected = [], []
+            for name in matched:
+                parts = _split_port_item(name + select, port_map, bit_connectivity, connected_signals)
+                connected.extend(parts[0])
+                unconnected.extend(parts[1])
+            if not matched or not connected:
+                unconnected = [item]
+            elif not unconnected:
+                connected = [item]
+        else:
+            connected, unconnected = _split_port_item(item, port_map, bit_connectivity, connected_signals)
+        connected_items.extend(connected)
+        unconnected_items.extend(unconnected)
+
+    if not unconnected_items:
+        return line, None
+    if not connected_items:
+        return None, line
+
+    options = ''.join(option + ' ' for option in collection.options)
+
+    def with_items(items):
+        return f"{line[:start]}[get_ports {options}{{{' '.join(items)}}}]{line[end:]}"
+    return with_items(connected_items), with_items(unconnected_items)
+
+
+SDC_COMMAND_NAME_RE = re.compile(r'[A-Za-z_]\w*$')
+
+# Commands whose arguments are never design objects
+OBJECT_FREE_COMMANDS = frozenset({
+    'set_units', 'set_hierarchy_separator', 'set_wire_load_mode', 'set_max_area',
+})
+
+# Arguments that carry no object names: numbers, options and all_* queries
+OBJECT_FREE_ARG_RE = re.compile(r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|-[A-Za-z_]\w*|\[\s*all_\w+\s*\]')
+
+
+class PromotionContext(NamedTuple):
+    """Per-instance state shared by the command handlers."""
+    index: RewriteIndex
+    port_map: Dict[str, PortMapping]
+    connected_signals: Set[str]
+    bit_connectivity: Optional[BitConnectivity]
+    instance_name: str
+    logger: Optional[logging.Logger]
+    ignored_lines: List[str]
+    hierarchy: Optional[HierarchyIndex] = None
+    unresolved: Optional[Dict[str, str]] = None
+
+
+class TemplateLine(NamedTuple):
+    """
+    One line of a compiled promotion template: the command dispatch, token scan
+    and get_ports collection are instance-independent and computed once.
+    """
+    text: str
+    command: Optional[str]
+    handler: Optional[Callable]
+    select_form: bool = False
+    slots: tuple = ()
+    collection: Optional[ObjectCollection] = None
+    location: Optional[SourceLocation] = None
+
+
+def _pass_through(template_line, context):
+    """Object-free commands skip name resolution; only whitespace is normalized."""
+    return ' '.join(template_line.text.split())
+
+
+def _promote_objects(template_line, context):
+    """Rewrite port references and prefix hierarchical pin/net paths with the instance."""
+    promoted_line = render_object_tokens(template_line.text, template_line.select_form, template_line.slots,
+                                         context.index, context.instance_name)
+    return promote_object_paths(promoted_line, context.instance_name, context.hierarchy,
+                                context.unresolved, context.logger)
+
+
+def _promote_io_delay(template_line, context):
+    """Drop or split input/output delays whose ports do not reach top-level I/O."""
+    line = template_line.text
+    if context.bit_connectivity is not None:
+        line, ignored_part = split_delay_by_connectivity(line, context.port_map, context.bit_connectivity,
+                                                         context.connected_signals, template_line.collection)
+        if ignored_part:
+            context.ignored_lines.append(f"# IGNORED (not connected to top I/O): {ignored_part}\n")
+        if line is None:
+            return None
+        if line is not template_line.text:
+            # Narrowed to the connected bits; the new text needs its own scan
+            select_form, slots = scan_object_tokens(line)
+            template_line = template_line._replace(text=line, select_form=select_form, slots=slots)
+    elif not is_delay_connected(line, context.port_map, context.connected_signals):
+        context.ignored_lines.append(f"# IGNORED (not connected to top I/O): {line}\n")
+        return None
+    return _promote_objects(template_line, context)
+
+
+def _ignore_source(template_line, context):
+    """source/read_sdc directives left by follow_sdc_sources() name IP-relative files; they are never promoted."""
+    context.ignored_lines.append(f"# IGNORED (sourced file not followed): {template_line.text}\n")
+    return None
+
+
+def _ignore_malformed(template_line, context):
+    """Commands the lexer could not split cleanly (unbalanced or glued groups) are never promoted."""
+    context.ignored_lines.append(f"# IGNORED (malformed constraint): {template_line.text}\n")
+    return None
+
+
+# Handlers keyed by SDC command name; anything else goes through _promote_objects.
+# Clock and path commands stay on _promote_objects so clock names renamed there
+# remain consistent with -clock and get_clocks references on other lines.
+SDC_COMMAND_HANDLERS = {
+    'set_input_delay': _promote_io_delay,
+    'set_output_delay': _promote_io_delay,
+}
+SDC_COMMAND_HANDLERS.update((command, _pass_through) for command in OBJECT_FREE_COMMANDS)
+SDC_COMMAND_HANDLERS.update((command, _ignore_source) for command in SOURCE_COMMANDS)
+
+
+def dispatch_sdc_command(command):
+    """Return (command_name, handler) for one lexed SDC command."""
+    if not SDC_COMMAND_NAME_RE.match(command.name):
+        return None, _ignore_malformed if command.errors else _promote_objects
+    handler = SDC_COMMAND_HANDLERS.get(command.name)
+    if command.errors and handler is not _ignore_source:
+        return command.name, _ignore_malformed
+    if handler is None:
+        args = command.words[1:]
+        handler = _pass_through if all(OBJECT_FREE_ARG_RE.fullmatch(arg) for arg in args) else _promote_objects
+    elif handler is _pass_through and command.collections:
+        handler = _promote_objects
+    return command.name, handler
+
+
+def iter_sdc_template(commands):
+    """Compile lexed SDC commands (or plain lines) one at a time into TemplateLine records."""
+    for command in commands:
+        if not isinstance(command, SDCCommand):
+            command = lex_command(command)
+        line = command.text
+        if command.is_comment:
+            yield TemplateLine(line, '<comment>', None, location=command.location)
+            continue
+        name, handler = dispatch_sdc_command(command)
+        if handler is _pass_through or handler is _ignore_malformed:
+            yield TemplateLine(line, name, handler, location=command.location)
+            continue
+        select_form, slots = scan_object_tokens(line, command)
+        collection = None
+        if handler is _promote_io_delay:
+            collection = next(iter(get_ports_collections(command)), None)
+        yield TemplateLine(line, name, handler, select_form, slots, collection, command.location)
+
+
+def compile_sdc_template(commands):
     """
-    Read SDC file and properly handle line continuations.
-    Returns a list of complete constraint lines, with line continuations joined.
+    Compile lexed SDC commands (or plain lines) into a promotion template, a
+    list of TemplateLine.
+
+    Everything that depends only on the IP's SDC text is done here, so promoting
+    one more instance of the same IP only resolves names and renders output.
     """
-    with open(sdc_file) as f:
-        raw_lines = f.readlines()
-    
-    # Join line continuations
-    processed_lines = []
-    current_line = ""
-    
-    for line in raw_lines:
-        line = line.rstrip('\r\n')  # Remove line endings but preserve other whitespace
-        
-        if line.endswith('\\'):
-            # Line continuation - remove the backslash and add to current line
-            current_line += line[:-1] + " "
-        else:
-            # End of constraint
-            current_line += line
-            if current_line.strip():  # Only add non-empty lines
-                processed_lines.append(current_line)
-            current_line = ""
-    
-    # Handle any remaining incomplete line
-    if current_line.strip():
-        processed_lines.append(current_line)
-    
-    return processed_lines
+    return list(iter_sdc_template(commands))
 
-def format_constraint_line(line):
+
+def log_command_stats(command_stats, logger):
+    """Log per-command line counts and promotion time, slowest first."""
+    if not command_stats:
+        return
+    logger.info("Per-command promotion profile:")
+    for command, (count, seconds) in sorted(command_stats.items(), key=lambda item: -item[1][1]):
+        logger.info(f"  {command:<28} {count:>8} lines {seconds * 1000:>10.2f} ms")
+
+
+def promote_sdc_lines(lines, port_map, connected_signals, instance_name, logger=None, engine='token',
+                      bit_connectivity=None, command_stats=None, template=None, hierarchy=None, sourced=False):
     """
-    Format a constraint line with proper indentation and line breaks for readability.
-    Avoids extremely wide lines by breaking at logical points.
+    Promote SDC by replacing source signals with target signals.
+    Only promote input/output delays for signals connected to top-level I/O.
+    Returns tuple of (promoted_lines, ignored_lines).
+
+    The default 'token' engine dispatches each line on its command name (see
+    SDC_COMMAND_HANDLERS), tokenizes it once and resolves object names through a
+    RewriteIndex; engine='legacy' runs the original regex sweeps on the
+    bit-expanded mapping. With bit_connectivity, delay constraints are split into
+    their connected and unconnected bit ranges instead of being kept or dropped whole.
+    A template from compile_sdc_template(lines) may be passed to reuse it across
+    instances. If command_stats is a dict, per-command [count, seconds] are
+    accumulated in it. With a HierarchyIndex, get_pins/get_nets paths that do not
+    exist in the target are flagged as UNRESOLVED comments in the ignored lines.
+    With sourced, promoted lines are SourcedLine carrying their instance and
+    source location (see iter_promoted_lines).
     """
-    line = line.strip()
-    if not line or line.startswith('#'):
-        return line + '\n'
-    
-    # Define maximum line length before breaking
-    MAX_LINE_LENGTH = 120
-    
-    if len(line) <= MAX_LINE_LENGTH:
-        return line + '\n'
-    
-    # For multi-argument constraints, try to break intelligently
-    formatted_line = ""
-    
-    # Check if this is a constraint with -from/-to/-through arguments
-    if any(arg in line for arg in ['-from', '-to', '-through']):
-        # Break into logical sections
-        sections = []
-        current_section = ""
-        
-        # Split by constraint arguments but keep the argument with its content
-        parts = re.split(r'(\s+-(?:from|to|through|setup|hold|max|min|clock)\s+)', line)
-        
-        for i, part in enumerate(parts):
-            if i == 0:  # First part (constraint name)
-                current_section = part
-            elif part.strip().startswith('-'):  # Argument flag
-                if current_section:
-                    sections.append(current_section)
-                current_section = "    " + part.strip()  # Indent arguments
-            else:  # Argument value
-                current_section += part
-        
-        if current_section:
-            sections.append(current_section)
-        
-        # Join sections with line continuations
-        if len(sections) > 1:
-            formatted_line = sections[0] + " \\\n"
-            for section in sections[1:-1]:
-                formatted_line += section + " \\\n"
-            formatted_line += sections[-1] + "\n"
-        else:
-            formatted_line = line + "\n"
-    
-    # For constraints with long get_ports/get_pins lists, try to break at logical points
-    elif any(cmd in line for cmd in ['get_ports', 'get_pins', 'get_nets', 'get_clocks']):
-        # Look for curly brace content that's very long
-        brace_match = re.search(r'\{([^}]+)\}', line)
-        if brace_match and len(brace_match.group(0)) > 80:
-            content = brace_match.group(1)
-            signals = [s.strip() for s in content.split() if s.strip()]
-            
-            if len(signals) > 3:  # Only break if more than 3 signals
-                # Group signals by 3-4 per line
-                signal_groups = []
-                for i in range(0, len(signals), 4):
-                    signal_groups.append(' '.join(signals[i:i+4]))
-                
-                # Find the position of the opening brace
-                before_brace = line[:line.find('{')]
-                after_brace = line[line.find('}') + 1:]
-                
-                formatted_line = before_brace + "{ \\\n"
-                for i, group in enumerate(signal_groups):
-                    if i == len(signal_groups) - 1:  # Last group
-                        formatted_line += "        " + group + " \\\n"
-                        formatted_line += "    }" + after_brace + "\n"
-                    else:
-                        formatted_line += "        " + group + " \\\n"
-            else:
-                formatted_line = line + "\n"
-        else:
-            formatted_line = line + "\n"
-    
-    else:
-        # For other long lines, try simple breaking at logical points
-        if len(line) > MAX_LINE_LENGTH:
-            # Try to break at spaces near logical points
-            if ' -' in line:
-                parts = line.split(' -')
-                formatted_line = parts[0] + " \\\n"
-                for part in parts[1:]:
-                    formatted_line += "    -" + part + " \\\n"
-                formatted_line = formatted_line.rstrip(' \\\n') + "\n"
-            else:
-                formatted_line = line + "\n"
+    if engine == 'legacy':
+        return promote_sdc_lines_legacy(lines, port_map_to_bit_map(port_map), connected_signals,
+                                        instance_name, logger)
+
+    if template is None:
+        template = compile_sdc_template(lines)
+
+    context = new_promotion_context(port_map, connected_signals, instance_name, logger, bit_connectivity, hierarchy)
+    promoted_lines = list(iter_promoted_lines(template, context, command_stats, sourced))
+    ignored_lines = context.ignored_lines
+    ignored_lines.extend(unresolved_notes(context))
+    return promoted_lines, ignored_lines
+
+
+def new_promotion_context(port_map, connected_signals, instance_name, logger=None, bit_connectivity=None,
+                          hierarchy=None):
+    """Build the PromotionContext of one instance, with empty ignored and unresolved collections."""
+    top_ports = bit_connectivity.ports if bit_connectivity is not None else ()
+    return PromotionContext(build_rewrite_index(port_map, top_ports), port_map, connected_signals,
+                            bit_connectivity, instance_name, logger, [], hierarchy, OrderedDict())
+
+
+class SourcedLine(str):
+    """
+    An output line carrying the (instance, (file, line)) it came from, for
+    --bundle_out. Merging and de-duplication pass lines through as they are,
+    so provenance needs no text -> origin table, identical lines of different
+    instances keep their own origins, and in a stream it is spooled beside
+    its line.
+    """
+
+    def __new__(cls, text, origin):
+        line = super().__new__(cls, text)
+        line.origin = origin
+        return line
+
+
+def iter_promoted_lines(template, context, command_stats=None, sourced=False):
+    """
+    Yield the promoted lines of a template (any iterable of TemplateLine).
+    Handlers append ignored lines to context.ignored_lines as they go. With
+    sourced, lines are yielded as SourcedLine carrying the (instance,
+    (file, line)) they were promoted from.
+    """
+    logger = context.logger
+    for template_line in template:
+        start = time.perf_counter()
+
+        # Comments and empty lines have no handler
+        if template_line.handler is None:
+            promoted_line = format_constraint_line(template_line.text)
         else:
-            formatted_line = line + "\n"
-    
-    return formatted_line
+            promoted_line = template_line.handler(template_line, context)
+            if promoted_line is not None:
+                if logger and promoted_line.strip() == template_line.text.strip():
+                    logger.debug(f"Constraint not modified - {template_line.text.strip()}")
+                promoted_line = format_constraint_line(promoted_line)
+
+        if command_stats is not None:
+            entry = command_stats.setdefault(template_line.command or '<unknown>', [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+        if promoted_line is not None:
+            if sourced:
+                location = template_line.location
+                promoted_line = SourcedLine(promoted_line, (context.instance_name,
+                                                            (location.file, location.line) if location else None))
+            yield promoted_line
+
+
+def unresolved_notes(context):
+    """Return the UNRESOLVED comments for the paths recorded in context.unresolved."""
+    unresolved = context.unresolved
+    if not unresolved:
+        return []
+    if context.logger:
+        context.logger.warning(f"{len(unresolved)} promoted paths of {context.instance_name} "
+                               "do not resolve in the target hierarchy")
+    notes = []
+    for path, line in unresolved.items():
+        if context.logger:
+            context.logger.debug(f"Unresolved path {path} in: {line.strip()}")
+        notes.append(f"# UNRESOLVED (not found in target hierarchy): {path}\n")
+    return notes
+
+
+def write_ignored_file(ignored_file, instance_name, source_sdc, ignored_lines, unresolved=False):
+    """Write the ignored constraints of one instance, with a header naming the instance and source SDC."""
+    with open_file(ignored_file, 'w') as f:
+        f.write(f"# Ignored constraints for instance {instance_name}\n")
+        f.write(f"# These constraints were not promoted because signals are not connected to top-level I/O\n")
+        if unresolved:
+            f.write("# UNRESOLVED entries were promoted, but their paths are missing from the target hierarchy\n")
+        f.write(f"# Source: {source_sdc}\n\n")
+        f.writelines(line if line.endswith('\n') else line + '\n' for line in ignored_lines)
+
+
+def stream_sdc_promotion(sdc_file, port_map, connected_signals, instance_name, ignored_file, logger=None,
+                         bit_connectivity=None, command_stats=None, hierarchy=None, sourced=False,
+                         reported_sources=None):
+    """
+    Streaming form of promote_sdc_lines for one instance: sdc_file is lexed
+    incrementally and promoted lines are yielded as they are produced, as
+    SourcedLine with sourced. Ignored lines are spooled to a temporary file and
+    written to ignored_file once the instance is exhausted. reported_sources is
+    passed to follow_sdc_sources.
+    """
+    context = new_promotion_context(port_map, connected_signals, instance_name, logger, bit_connectivity, hierarchy)
+    ignored_lines = context.ignored_lines
+    promoted_count = ignored_count = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+        def drain_ignored():
+            spool.writelines(line if line.endswith('\n') else line + '\n' for line in ignored_lines)
+            count = len(ignored_lines)
+            ignored_lines.clear()
+            return count
+
+        template = iter_sdc_template(follow_sdc_sources(iter_sdc_commands(sdc_file), logger, reported_sources))
+        for line in iter_promoted_lines(template, context, command_stats, sourced):
+            ignored_count += drain_ignored()
+            promoted_count += 1
+            yield line
+        ignored_lines.extend(unresolved_notes(context))
+        ignored_count += drain_ignored()
+
+        if ignored_count:
+            spool.seek(0)
+            write_ignored_file(ignored_file, instance_name, sdc_file, spool, bool(context.unresolved))
+            if logger:
+                logger.debug(f"  -> {ignored_count} ignored constraints written to {ignored_file}")
+    if logger:
+        logger.info(f"  -> {instance_name}: {promoted_count} constraints promoted, {ignored_count} ignored")
 
-def promote_sdc_lines(lines, bit_map, connected_signals, instance_name, logger=None):
+
+def promote_sdc_lines_legacy(lines, bit_map, connected_signals, instance_name, logger=None):
     """
     Promote SDC by replacing source signals with target signals.
     Only promote input/output delays for signals connected to top-level I/O.
     Returns tuple of (promoted_lines, ignored_lines).
+
+    This is the original regex-substitution engine, kept selectable through
+    --rewrite_engine legacy so its output can be compared with the token engine.
     """
     promoted_lines = []
     ignored_lines = []
@@ -529,6 +2897,9 @@ def promote_sdc_lines(lines, bit_map, connected_signals, instance_name, logger=N
         if line.strip().startswith('#') or not line.strip():
             promoted_lines.append(format_constraint_line(line))
             continue
+        if line.split()[0] in SOURCE_COMMANDS:
+            ignored_lines.append(f"# IGNORED (sourced file not followed): {original_line}")
+            continue
         
         # Check if this is an input/output delay constraint
         if 'set_input_delay' in line or 'set_output_delay' in line:
@@ -740,165 +3111,295 @@ def promote_sdc_lines(lines, bit_map, connected_signals, instance_name, logger=N
     
     return promoted_lines, ignored_lines
 
+@lru_cache(maxsize=1 << 16)
 def parse_sdc_command(line):
-    """Parse an SDC command to extract command type and target signals."""
+    """
+    Parse an SDC command to extract command type and target signals.
+    Results are cached, since merging and de-duplication revisit the same lines.
+    """
     line = line.strip()
-    if not line or line.startswith('#'):
+    command = lex_command(line) if line else None
+    if command is None or command.is_comment or not SDC_COMMAND_NAME_RE.match(command.name):
         return None, None, line
-    
-    # Extract command type (first word)
-    cmd_match = re.match(r'(\w+)', line)
-    if not cmd_match:
+
+    collections = ((collection.command, collection.objects) for collection in command.collections)
+    return _command_key(command.name, command.options, collections, line)
+
+def bundle_command_key(record):
+    """parse_sdc_command() of a bundle record, taken from its stored command, options and objects."""
+    line = record['text'].strip()
+    if record['command'] is None or not SDC_COMMAND_NAME_RE.match(record['command']):
         return None, None, line
-    
-    cmd_type = cmd_match.group(1)
-    
+    collections = ((collection['query'], collection['objects']) for collection in record['objects'])
+    return _command_key(record['command'], [tuple(option) for option in record['options']], collections, line)
+
+def _command_key(cmd_type, options, collections, line):
+    """(command type, targets, line) of a command from its name, (flag, value) options and (query, objects) pairs."""
+    flags = {flag for flag, _ in options}
+
     # For delay constraints, include -max/-min in the command type
     if cmd_type in ['set_input_delay', 'set_output_delay']:
-        if '-max' in line:
+        if '-max' in flags:
             cmd_type += '_max'
-        elif '-min' in line:
+        elif '-min' in flags:
             cmd_type += '_min'
-    
-    # Extract target signals from get_ports, get_pins, get_nets, etc.
-    targets = []
-    
-    # Handle get_ports [list of ports]
-    port_patterns = re.findall(r'\[get_ports\s+([^\]]+)\]', line)
-    for pattern in port_patterns:
-        # Remove quotes and split on whitespace to handle multiple ports
-        ports = re.findall(r'[\w\[\]:]+', pattern)
-        targets.extend(ports)
-    
-    # Handle get_pins [list of pins]  
-    pin_patterns = re.findall(r'\[get_pins\s+([^\]]+)\]', line)
-    for pattern in pin_patterns:
-        pins = re.findall(r'[\w\[\]:/.]+', pattern)
-        targets.extend(pins)
-    
-    # Handle get_nets [list of nets]
-    net_patterns = re.findall(r'\[get_nets\s+([^\]]+)\]', line)
-    for pattern in net_patterns:
-        nets = re.findall(r'[\w\[\]:/.]+', pattern)
-        targets.extend(nets)
-    
+
+    # Target signals are the objects of the get_ports, get_pins and get_nets collections
+    targets = [obj for query, objects in collections
+               if query in ('get_ports', 'get_pins', 'get_nets')
+               for obj in objects]
+
     # For clock creation, also consider the clock name
     if cmd_type == 'create_clock':
-        clock_name_match = re.search(r'-name\s+(\w+)', line)
-        if clock_name_match:
-            targets.append(f"clock:{clock_name_match.group(1)}")
-    
-    return cmd_type, targets, line
+        clock_name = next((value for flag, value in options if flag == '-name'), None)
+        if clock_name:
+            targets.append(f"clock:{clock_name.strip('{}')}")
+
+    return cmd_type, tuple(targets), line
 
-def merge_with_initial_sdc(initial_sdc_lines, promoted_lines):
+def _parsed_command(line, parsed):
+    """parse_sdc_command(line), unless parsed (a dict of line -> result, e.g. from a bundle) already holds it."""
+    if parsed and line in parsed:
+        return parsed[line]
+    return parse_sdc_command(line)
+
+def merge_with_initial_sdc(initial_sdc_lines, promoted_lines, parsed=None):
     """
     Merge initial SDC constraints with promoted ones.
-    Initial SDC takes precedence for conflicting constraints.
+    Initial SDC takes precedence for conflicting constraints. parsed may map
+    lines to their parse_sdc_command() result so they are not lexed again.
     """
     if not initial_sdc_lines:
         return promoted_lines
-    
-    # Parse both sets of constraints
-    initial_constraints = {}
-    promoted_constraints = {}
-    
+    return list(iter_merge_with_initial_sdc(initial_sdc_lines, promoted_lines, parsed))
+
+def iter_merge_with_initial_sdc(initial_sdc_lines, promoted_lines, parsed=None):
+    """
+    Streaming form of merge_with_initial_sdc: yields the initial SDC lines, then
+    each promoted line (any iterable) that does not conflict with them.
+    """
     # Process initial SDC first (higher priority)
+    initial_constraints = set()
     for line in initial_sdc_lines:
-        cmd_type, targets, clean_line = parse_sdc_command(line)
-        if cmd_type and targets:
-            for target in targets:
-                key = f"{cmd_type}::{target}"
-                initial_constraints[key] = line
-    
-    # Process promoted SDC
-    for line in promoted_lines:
-        cmd_type, targets, clean_line = parse_sdc_command(line)
+        cmd_type, targets, clean_line = _parsed_command(line, parsed)
         if cmd_type and targets:
             for target in targets:
-                key = f"{cmd_type}::{target}"
-                if key not in initial_constraints:  # Only add if not in initial
-                    promoted_constraints[key] = line
-    
-    # Combine: initial SDC first, then non-conflicting promoted constraints
-    result = list(initial_sdc_lines)
-    
+                initial_constraints.add(f"{cmd_type}::{target}")
+    yield from initial_sdc_lines
+
     # Add promoted constraints that don't conflict
     added_promoted = set()
     for line in promoted_lines:
-        cmd_type, targets, clean_line = parse_sdc_command(line)
+        cmd_type, targets, clean_line = _parsed_command(line, parsed)
         if cmd_type and targets:
-            conflict = False
-            for target in targets:
-                key = f"{cmd_type}::{target}"
-                if key in initial_constraints:
-                    conflict = True
-                    break
-            if not conflict and line not in added_promoted:
-                result.append(line)
-                added_promoted.add(line)
+            if any(f"{cmd_type}::{target}" in initial_constraints for target in targets):
+                continue
+        # Non-constraint lines (comments, etc.) are added once as well
+        if line not in added_promoted:
+            added_promoted.add(line)
+            yield line
+
+# Commands whose constraint on a collection equals the same constraint on each member
+COMPACTABLE_COMMANDS = frozenset({
+    'set_input_delay', 'set_output_delay', 'set_load', 'set_driving_cell', 'set_drive',
+    'set_input_transition', 'set_max_transition', 'set_max_capacitance', 'set_max_fanout',
+    'set_false_path', 'set_multicycle_path', 'set_max_delay', 'set_min_delay', 'set_case_analysis',
+})
+
+
+def compact_port_items(items, net_ranges):
+    """
+    Merge get_ports objects into as few references as possible: bits and ranges
+    of one bus become bus[msb:lsb] runs, or bus[*] when every declared bit is
+    covered. Objects that are not plain bus references are kept as they are.
+    """
+    merged = OrderedDict()  # base name -> set of bits, or item -> None for opaque objects
+    for item in items:
+        m = NET_REF_RE.match(item) if not item.startswith('\\') else None
+        base = m.group(1) if m else TRAILING_SELECT_RE.sub('', item)
+        declared = net_ranges.get(base)
+        if m and m.group(2) is not None:
+            msb, lsb = int(m.group(2)), int(m.group(3) if m.group(3) is not None else m.group(2))
+            bits = set(range(min(msb, lsb), max(msb, lsb) + 1))
+        elif declared and declared[1] > 1 and (m or item == base + '[*]'):
+            bits = set(range(declared[0], declared[0] + declared[1]))
         else:
-            # Non-constraint lines (comments, etc.) - add them
-            if line not in added_promoted:
-                result.append(line)
-                added_promoted.add(line)
+            merged[item] = None  # a whole object subsumes bits gathered for it
+            continue
+        if base in merged and merged[base] is None:
+            continue
+        merged.setdefault(base, set()).update(bits)
+
+    compacted = []
+    for name, bits in merged.items():
+        if bits is None:
+            compacted.append(name)
+            continue
+        declared = net_ranges.get(name)
+        if declared and bits == set(range(declared[0], declared[0] + declared[1])):
+            compacted.append(f"{name}[*]")
+            continue
+        runs = []
+        for bit in sorted(bits, reverse=True):
+            if runs and runs[-1][1] == bit + 1:
+                runs[-1][1] = bit
+            else:
+                runs.append([bit, bit])
+        compacted.extend(f"{name}[{hi}]" if hi == lo else f"{name}[{hi}:{lo}]" for hi, lo in runs)
+    return list(dict.fromkeys(compacted))
+
+
+def compact_constraints(lines, net_ranges, logger=None):
+    """
+    Merge constraints that differ only in their get_ports objects into one
+    constraint on the union of the objects, with bits folded into ranges.
+
+    Only COMPACTABLE_COMMANDS are merged, and a line only joins the latest group
+    of its command, so no constraint moves across another one of the same command
+    that could override it. Lines are compared with continuations joined; lines
+    that are not merged are returned unchanged.
+    """
+    entries = []  # [line, prefix, suffix, items]
+    open_groups = {}  # command -> index of the entry later lines may join
+    for line in lines:
+        flat = ' '.join(line.replace('\\\n', ' ').split())
+        parsed = lex_command(flat) if flat else None
+        command = parsed.name if parsed is not None else None
+        if command not in COMPACTABLE_COMMANDS:
+            entries.append([line, None, None, None])
+            continue
+        collections = get_ports_collections(parsed)
+        if len(collections) != 1 or collections[0].options or '#' in flat or ';' in flat:
+            open_groups.pop(command, None)
+            entries.append([line, None, None, None])
+            continue
+        collection = collections[0]
+        prefix, suffix = flat[:collection.start], flat[collection.end:]
+        group = open_groups.get(command)
+        if group is not None and entries[group][1] == prefix and entries[group][2] == suffix:
+            entries[group][0] = None
+            entries[group][3].extend(collection.objects)
+            continue
+        open_groups[command] = len(entries)
+        entries.append([line, prefix, suffix, list(collection.objects)])
+
+    compacted = []
+    for line, prefix, suffix, items in entries:
+        if line is not None:
+            compacted.append(line)
+            continue
+        objects = compact_port_items(items, net_ranges)
+        collection = objects[0] if len(objects) == 1 else '{' + ' '.join(objects) + '}'
+        compacted.append(format_constraint_line(f"{prefix}[get_ports {collection}]{suffix}"))
+
+    if logger and len(compacted) != len(lines):
+        logger.info(f"Compacted {len(lines)} promoted lines into {len(compacted)}")
+    return compacted
+
+
+def remove_duplicates(lines, parsed=None):
+    """
+    Remove duplicate and conflicting SDC lines while preserving order. parsed
+    may map lines to their parse_sdc_command() result (see merge_with_initial_sdc).
+    """
+    dropped = set()
+    result = list(deduplicate_lines(lines, dropped, parsed))
     
-    return result
+    # Remove overwritten commands
+    return [line for number, line in enumerate(result) if number not in dropped]
 
-def remove_duplicates(lines):
-    """Remove duplicate and conflicting SDC lines while preserving order."""
-    seen_exact = OrderedDict()  # For exact duplicates
-    command_targets = OrderedDict()  # For conflicting constraints
-    result = []
+def deduplicate_lines(lines, dropped, parsed=None):
+    """
+    Streaming core of remove_duplicates. Yields every line that is kept when it
+    is first seen; once all targets of a yielded line are overwritten by later
+    conflicting lines, its number (0-based, in yield order) is added to dropped.
+    """
+    seen_exact = set()  # For exact duplicates
+    command_targets = {}  # For conflicting constraints
+    live_targets = {}  # line number -> keys not yet overwritten by a later line
+    count = 0
     
     for line in lines:
-        original_line = line
-        cmd_type, targets, clean_line = parse_sdc_command(line)
+        cmd_type, targets, clean_line = _parsed_command(line, parsed)
         
         if not clean_line.strip():
             continue
             
-        # Check for exact duplicates first
-        if clean_line in seen_exact:
-            continue
-        seen_exact[clean_line] = True
-        
-        # If we can't parse the command or it has no targets, just add it
-        if not cmd_type or not targets:
-            result.append(original_line)
+        # Check for exact duplicates first; source markers delimit each instance's copy of a file
+        if clean_line in seen_exact and not SOURCE_MARKER_RE.match(clean_line):
             continue
+        seen_exact.add(clean_line)
         
         # For commands that can conflict, check against previous commands
         if cmd_type in ['set_input_delay_max', 'set_input_delay_min', 'set_output_delay_max', 'set_output_delay_min', 
-                       'set_max_transition', 'set_max_delay', 'set_min_delay', 'create_clock']:
+                       'set_max_transition', 'set_max_delay', 'set_min_delay', 'create_clock'] and targets:
             
-            # Create a key that identifies the command type and its targets
-            for target in targets:
-                key = f"{cmd_type}::{target}"
-                
-                # For create_clock, we want to avoid duplicates completely
-                if cmd_type == 'create_clock':
-                    if key not in command_targets:
-                        command_targets[key] = len(result)
-                        result.append(original_line)
-                    # Skip duplicate clock creation
-                    break
-                else:
-                    # For other commands, keep the latest constraint (overwrite)
-                    if key in command_targets:
-                        # Replace the previous command
-                        old_index = command_targets[key]
-                        result[old_index] = None  # Mark for removal
-                    
-                    command_targets[key] = len(result)
-                    result.append(original_line)
-        else:
-            # For other commands (false_path, multicycle_path, etc.), just add them
-            result.append(original_line)
-    
-    # Remove None entries (overwritten commands)
-    result = [line for line in result if line is not None]
-    
-    return result
+            # For create_clock, we want to avoid duplicates completely
+            if cmd_type == 'create_clock':
+                key = f"{cmd_type}::{targets[0]}"
+                if key in command_targets:
+                    continue
+                command_targets[key] = count
+            else:
+                # For other commands, keep the latest constraint per target; a line
+                # is dropped once every one of its targets has been overwritten
+                for target in targets:
+                    key = f"{cmd_type}::{target}"
+                    if command_targets.get(key, count) != count:
+                        old_number = command_targets[key]
+                        live_targets[old_number].discard(key)
+                        if not live_targets[old_number]:
+                            del live_targets[old_number]
+                            dropped.add(old_number)
+                    command_targets[key] = count
+                live_targets[count] = {f"{cmd_type}::{target}" for target in targets}
+        
+        # Unparsed lines, lines without targets and other commands (false_path, multicycle_path, etc.) are just added
+        yield line
+        count += 1
+
+def _read_spool(spool, chunk_size=1 << 20):
+    """Yield the NUL-separated records of a spool file from the start."""
+    spool.seek(0)
+    pending = ''
+    while True:
+        chunk = spool.read(chunk_size)
+        if not chunk:
+            break
+        records = (pending + chunk).split('\0')
+        pending = records.pop()
+        yield from records
+    if pending:
+        yield pending
+
+def write_deduplicated(lines, output_file, on_write=None, parsed=None):
+    """
+    Write lines (any iterable) to output_file with remove_duplicates applied,
+    without holding them in memory: kept lines are spooled to a temporary file
+    and copied out once every later line that could overwrite them has been seen.
+    on_write, if given, is called with each line written and its origin; the
+    origin of a SourcedLine is spooled beside it, other lines have None. parsed
+    is passed on to deduplicate_lines. Returns the number of lines written.
+    """
+    dropped = set()
+    written = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+        for line in deduplicate_lines(lines, dropped, parsed):
+            spool.write(line)
+            spool.write('\0')
+            if on_write is not None:
+                spool.write(json.dumps(getattr(line, 'origin', None)))
+                spool.write('\0')
+        records = _read_spool(spool)
+        with open_file(output_file, 'w') as f:
+            for number, line in enumerate(records):
+                origin = json.loads(next(records)) if on_write is not None else None
+                if number not in dropped:
+                    f.write(line)
+                    if on_write is not None:
+                        on_write(line, origin)
+                    written += 1
+    return written
 
 def main():
     """Main function with enhanced argument parsing and error handling."""
@@ -918,100 +3419,300 @@ Examples:
   
   # Multiple instances
   %(prog)s --source_rtl ip1.v ip2.v --source_sdc ip1.sdc ip2.sdc --target_rtl top.v --target_sdc top.sdc --instance ip1_inst ip2_inst
+  
+  # Every instance of one IP module
+  %(prog)s --source_rtl ip.v --source_sdc ip.sdc --target_rtl top.v --target_sdc top.sdc --module ip
         """)
     
-    parser.add_argument("--source_rtl", nargs='+', required=True, help="List of source IP Verilog files")
+    parser.add_argument("--source_rtl", nargs='+', required=True,
+                        help="List of source IP Verilog files, or -f filelists (*.f) whose top module is the IP")
     parser.add_argument("--source_sdc", nargs='+', required=True, help="List of source IP SDC files") 
-    parser.add_argument("--target_rtl", required=True, help="Path to target top-level Verilog file")
+    parser.add_argument("--target_rtl", required=True,
+                        help="Path to target top-level Verilog file, or a -f filelist (*.f) of the design")
     parser.add_argument("--target_sdc", required=True, help="Path to output top-level SDC file")
-    parser.add_argument("--instance", nargs='+', required=True, help="List of instance names in top-level design")
+    instance_group = parser.add_mutually_exclusive_group(required=True)
+    instance_group.add_argument("--instance", nargs='+', help="List of instance names in top-level design")
+    instance_group.add_argument("--module", help="Promote every instance of this IP module found in the target RTL")
+    parser.add_argument("--top", help="Top module of --target_rtl (default: detected from the instantiations in the file)")
+    parser.add_argument("--hier_rtl", nargs='+', default=[],
+                        help="Verilog files of intermediate modules for hierarchical instance paths (e.g. u_subsys/u_ip)")
+    parser.add_argument("--jobs", type=int,
+                        help="Processes parsing the files of filelists (default: one per CPU)")
     parser.add_argument("--initial_sdc", help="Optional initial SDC file to merge with promoted constraints")
+    parser.add_argument("--bundle_in",
+                        help="Constraint bundle from an earlier --bundle_out run to start from, merged like --initial_sdc")
+    parser.add_argument("--bundle_out",
+                        help="Also write the final constraints as a JSON Lines bundle (see scripts/sdc_bundle.py)")
     parser.add_argument("--ignored_dir", default=".", help="Directory to store ignored constraint files")
+    parser.add_argument("--compress", choices=[suffix[1:] for suffix in CODECS],
+                        help="Compress the mappings and ignored constraint files in --ignored_dir "
+                             "(--target_sdc is compressed when its name ends in .gz, .bz2 or .xz)")
+    parser.add_argument("--compact", action='store_true',
+                        help="Merge promoted constraints that differ only in their ports into bit ranges and collections")
+    parser.add_argument("--stream", action='store_true',
+                        help="Read, promote, de-duplicate and write constraints as a stream, for very large SDCs")
+    parser.add_argument("--rewrite_engine", choices=['token', 'legacy'], default='token',
+                        help="Constraint rewrite engine; 'legacy' runs the original regex substitutions for output comparison")
     parser.add_argument("--debug", action='store_true', help="Enable debug mode with detailed logging")
     parser.add_argument("--verbose", action='store_true', help="Enable verbose output")
     parser.add_argument("--version", action='version', version='%(prog)s 2.0')
     
     args = parser.parse_args()
+    if args.stream and args.compact:
+        parser.error("--compact needs all promoted lines at once and cannot be used with --stream")
+    if args.stream and args.rewrite_engine == 'legacy':
+        parser.error("--stream supports the token rewrite engine only")
     
     # Setup logging
     logger = setup_logging(debug=args.debug, verbose=args.verbose, log_dir=args.ignored_dir)
     
     # Initialize mappings file
-    mappings_file = f"{args.ignored_dir}/mappings.txt"
-    with open(mappings_file, 'w') as f:
+    artifact_suffix = f".{args.compress}" if args.compress else ''
+    mappings_file = f"{args.ignored_dir}/mappings.txt{artifact_suffix}"
+    with open_file(mappings_file, 'w') as f:
         f.write("# Signal mappings from IP ports to top-level signals\n")
         f.write("# Format: source_port -> target_signal\n\n")
 
+    # Filelists are parsed up front, file by file in a process pool, into one design index;
+    # with plain files only module names are read here and modules are parsed on demand.
+    # Yosys JSON netlists are structured already and are indexed whole.
+    filelists = {path: read_filelist(path) for path in [args.target_rtl] + args.source_rtl if is_filelist(path)}
+    input_rtl = list(dict.fromkeys(args.hier_rtl + [args.target_rtl] + args.source_rtl))
+    netlists = [path for path in input_rtl if is_yosys_json(path)]
+    rtl_files = [rtl for path in input_rtl if path not in netlists
+                 for rtl in (filelists[path].files if path in filelists else [path])]
+    # Every other input is loaded ahead in threads while the design is indexed and earlier
+    # instances are promoted; filelist designs are read by the index_design() workers, and
+    # streamed SDCs are read a command at a time instead
+    loaders = dict.fromkeys([] if filelists else rtl_files, read_verilog)
+    loaders.update(dict.fromkeys(netlists, read_netlist))
+    if not args.stream:
+        loaders.update(dict.fromkeys(args.source_sdc, read_sdc_commands))
+    loaders.update({args.bundle_in: read_bundle, args.initial_sdc: read_sdc_commands})
+    prefetcher = InputPrefetcher(loaders)
+    if filelists:
+        incdirs = list(dict.fromkeys(incdir for filelist in filelists.values() for incdir in filelist.incdirs))
+        design = index_design(rtl_files, incdirs, args.jobs, logger)
+    else:
+        design = DesignIndex(index_module_files(prefetcher.ready(rtl_files, read_verilog)), {}, {})
+    for netlist in prefetcher.ready(netlists, read_netlist):
+        netlist_design = index_yosys_netlist(netlist)
+        for module, path in netlist_design.module_files.items():
+            if module not in design.module_files:
+                design.module_files[module] = path
+                design.ports[module] = netlist_design.ports[module]
+                design.instances[module] = netlist_design.instances[module]
+        logger.info(f"Indexed {len(netlist_design.module_files)} modules from netlist {netlist}")
+
+    # Locate the top module; other modules are only parsed when the hierarchy reaches them
+    if args.target_rtl in filelists:
+        top_modules = design_top_modules(design, filelists[args.target_rtl].files)
+        defined = {module for module, rtl in design.module_files.items() if rtl in filelists[args.target_rtl].files}
+    elif args.target_rtl in netlists:
+        top_modules = netlist_top_modules(design, args.target_rtl)
+        defined = read_netlist(args.target_rtl)
+    else:
+        top_modules = find_top_modules(args.target_rtl)
+        defined = module_spans(args.target_rtl)
+    if args.top:
+        if args.top not in defined:
+            raise RuntimeError(f"Module {args.top} not found in {args.target_rtl}")
+        top = args.top
+    else:
+        top = top_modules[0] if top_modules else None
+        if len(top_modules) > 1:
+            logger.warning(f"Several candidate top modules in {args.target_rtl} ({' '.join(top_modules)}); "
+                           f"using {top}, select another with --top")
+    logger.info(f"Top module: {top}")
+    if args.target_rtl in filelists or args.target_rtl in netlists:
+        if top is None:
+            raise RuntimeError(f"No module found in {args.target_rtl}")
+        args.target_rtl = design.module_files[top]
+
+    # Index every instantiation of the top module in one pass
+    if top in design.instances:
+        instance_index = design.instances[top]
+    else:
+        instance_index = index_module_instances(args.target_rtl, parent=top)
+        if top:
+            design.instances[top] = instance_index
+    logger.info(f"Indexed {len(instance_index)} instances in {args.target_rtl}")
+    if args.module:
+        args.instance = [instance.name for instance in find_module_instances(instance_index, args.module)]
+        if not args.instance:
+            raise RuntimeError(f"No instances of module {args.module} found in {args.target_rtl}")
+        logger.info(f"Found {len(args.instance)} instances of {args.module}: {' '.join(args.instance)}")
+        if len(args.source_rtl) == len(args.source_sdc) == 1:
+            args.source_rtl = args.source_rtl * len(args.instance)
+            args.source_sdc = args.source_sdc * len(args.instance)
+
     if not (len(args.source_rtl) == len(args.source_sdc) == len(args.instance)):
         raise RuntimeError("Number of source RTLs, SDCs, and instances must match")
 
     # Analyze signal connectivity in target RTL
     logger.info("Analyzing signal connectivity...")
-    connected_signals, assign_map, top_level_ports = analyze_signal_connectivity(args.target_rtl)
+    connected_signals, _, top_level_ports = analyze_signal_connectivity(args.target_rtl, top)
     logger.info(f"Found {len(connected_signals)} signals connected to top-level I/O")
     logger.info(f"Found {len(top_level_ports)} top-level ports")
+    bit_connectivity = analyze_bit_connectivity(args.target_rtl, top)
+    logger.info(f"Tracked per-bit connectivity for {len(bit_connectivity.masks)} nets")
+    assign_trace = trace_assigns(args.target_rtl, top)
+    hierarchy = build_hierarchy_index(args.target_rtl, instance_index, design, top)
+    logger.info(f"Indexed hierarchical names of {len(design.module_files)} modules")
 
     # Load initial SDC if provided
+    # Output lines carry their instance and source line for --bundle_out (see SourcedLine)
+    sourced = bool(args.bundle_out)
+
+    # Load the initial constraints: a bundle from an earlier run, which needs no lexing, and an SDC.
+    # Bundle records go to merging and de-duplication as parsed, and back out to --bundle_out as they are
     initial_sdc_lines = []
+    bundle_parsed = {}
+    bundle_records = {}
+    if args.bundle_in:
+        logger.info(f"Loading constraint bundle from {args.bundle_in}")
+        for record in prefetcher.load(args.bundle_in, read_bundle):
+            initial_sdc_lines.append(SourcedLine(record['text'], record_origin(record)) if sourced
+                                     else record['text'])
+            bundle_parsed.setdefault(record['text'], bundle_command_key(record))
+            bundle_records.setdefault(record['text'], record)
     if args.initial_sdc:
         logger.info(f"Loading initial SDC from {args.initial_sdc}")
-        initial_sdc_lines = parse_sdc(args.initial_sdc)
+        for command in prefetcher.load(args.initial_sdc, read_sdc_commands):
+            origin = (None, (command.location.file, command.location.line))
+            initial_sdc_lines.append(SourcedLine(command.text, origin) if sourced else command.text)
 
     all_promoted_lines = []
+    promotion_streams = []
+    command_stats = {}
+    compiled_ips = {}
+    reported_sources = set()  # unfollowed source/read_sdc locations, warned about once per run
     
     # Process each IP separately
     for i, (rtl, sdc, inst) in enumerate(zip(args.source_rtl, args.source_sdc, args.instance)):
         logger.info(f"Processing {inst} ({rtl}, {sdc})")
         
         # Add instance header to mappings file
-        with open(mappings_file, 'a') as f:
+        with open_file(mappings_file, 'a') as f:
             f.write(f"# Instance: {inst}\n")
         
-        source_ports = parse_verilog_ports(rtl)
-        mapping = parse_connection_map(args.target_rtl, inst)
+        # Identical (RTL, SDC) pairs are parsed and compiled once, then stamped per instance;
+        # when streaming, the SDC is instead re-read for every instance
+        ip_key = (str(Path(rtl).resolve()), str(Path(sdc).resolve()))
+        if ip_key not in compiled_ips:
+            if rtl in filelists or rtl in netlists:
+                ip_modules = (design_top_modules(design, filelists[rtl].files) if rtl in filelists
+                              else netlist_top_modules(design, rtl))
+                if not ip_modules:
+                    raise RuntimeError(f"No module found in {rtl}")
+                logger.debug(f"IP module of {rtl}: {ip_modules[0]}")
+                ip_ports = design.ports[ip_modules[0]]
+            else:
+                ip_ports = parse_verilog_ports(rtl)
+            if args.stream:
+                compiled_ips[ip_key] = (ip_ports, None, None)
+            else:
+                sdc_commands = list(follow_sdc_sources(prefetcher.load(sdc, read_sdc_commands), logger,
+                                                       reported_sources))
+                sdc_lines = [command.text for command in sdc_commands]
+                compiled_ips[ip_key] = (ip_ports, sdc_lines, compile_sdc_template(sdc_commands))
+        else:
+            logger.debug(f"Reusing compiled template for {rtl}, {sdc}")
+        source_ports, sdc_lines, template = compiled_ips[ip_key]
+        if inst in instance_index or '/' not in inst:
+            mapping = parse_connection_map(args.target_rtl, inst, instance_index)
+            record = instance_index.get(inst)
+            if record is not None and record.array_element:
+                mapping = slice_array_connections(mapping, record.array_element, source_ports, bit_connectivity.ranges)
+            
+            # Trace mapped signals to their ultimate top-level ports
+            traced_mapping = {}
+            for ip_port, signal in mapping.items():
+                top_port = assign_trace.trace(signal)
+                traced_mapping[ip_port] = top_port
+                logger.debug(f"Traced {ip_port}: {signal} -> {top_port}")
+        else:
+            # Hierarchical path: compose the port maps of every level down to the IP
+            chain = resolve_instance_chain(inst, args.target_rtl, instance_index, design)
+            logger.debug(f"Hierarchy chain for {inst}: " +
+                         " -> ".join(f"{record.name} ({record.module})" for _, record in chain))
+            traced_mapping = compose_hierarchy_mapping(chain, bit_connectivity, logger)
+            for ip_port, signal in traced_mapping.items():
+                logger.debug(f"Traced {ip_port}: {chain[-1][1].connections.get(ip_port)} -> {signal}")
         
-        # Trace mapped signals to their ultimate top-level ports
-        traced_mapping = {}
-        for ip_port, signal in mapping.items():
-            top_port = trace_signal_to_top_port(signal, assign_map, top_level_ports)
-            traced_mapping[ip_port] = top_port
-            logger.debug(f"Traced {ip_port}: {signal} -> {top_port}")
+        port_map = build_port_map(traced_mapping, source_ports, logger, mappings_file, bit_connectivity.ranges)
+        file_stem = re.sub(r'[^\w.-]', '_', inst)
+        ignored_file = f"{args.ignored_dir}/{file_stem}_ignored_constraints.sdc{artifact_suffix}"
         
-        bit_map = expand_vector_signals(traced_mapping, source_ports, logger, mappings_file)
-        sdc_lines = parse_sdc(sdc)
+        # Add blank line in mappings file between instances
+        if args.stream:
+            with open_file(mappings_file, 'a') as f:
+                f.write("\n")
+            promotion_streams.append(stream_sdc_promotion(sdc, port_map, connected_signals, inst, ignored_file,
+                                                          logger, bit_connectivity, command_stats, hierarchy,
+                                                          sourced, reported_sources))
+            continue
         
         # Promote with connectivity checking
-        promoted_lines, ignored_lines = promote_sdc_lines(sdc_lines, bit_map, connected_signals, inst, logger)
+        promoted_lines, ignored_lines = promote_sdc_lines(sdc_lines, port_map, connected_signals, inst, logger,
+                                                          engine=args.rewrite_engine,
+                                                          bit_connectivity=bit_connectivity,
+                                                          command_stats=command_stats, template=template,
+                                                          hierarchy=hierarchy, sourced=sourced)
         all_promoted_lines.extend(promoted_lines)
         
         # Write ignored constraints to separate file
         if ignored_lines:
-            ignored_file = f"{args.ignored_dir}/{inst}_ignored_constraints.sdc"
-            with open(ignored_file, 'w') as f:
-                f.write(f"# Ignored constraints for instance {inst}\n")
-                f.write(f"# These constraints were not promoted because signals are not connected to top-level I/O\n")
-                f.write(f"# Source: {sdc}\n\n")
-                f.writelines(ignored_lines)
+            write_ignored_file(ignored_file, inst, sdc, ignored_lines,
+                               any(line.startswith('# UNRESOLVED') for line in ignored_lines))
             logger.debug(f"  -> {len(ignored_lines)} ignored constraints written to {ignored_file}")
         
         logger.info(f"  -> {len(promoted_lines)} constraints promoted, {len(ignored_lines)} ignored")
         
         # Add blank line in mappings file between instances
-        with open(mappings_file, 'a') as f:
+        with open_file(mappings_file, 'a') as f:
             f.write("\n")
 
+    if args.stream:
+        # Lines flow from the lexer through promotion and merging into the writer;
+        # only the de-duplication state grows with the input
+        promoted_lines = (line for stream in promotion_streams for line in stream)
+        if initial_sdc_lines:
+            promoted_lines = iter_merge_with_initial_sdc(initial_sdc_lines, promoted_lines, bundle_parsed)
+        if args.bundle_out:
+            with BundleWriter(args.bundle_out, bundle_records) as bundle:
+                written = write_deduplicated(promoted_lines, args.target_sdc, bundle.write, bundle_parsed)
+            logger.info(f"Constraint bundle with {bundle.count} records written to {args.bundle_out}")
+        else:
+            written = write_deduplicated(promoted_lines, args.target_sdc, parsed=bundle_parsed)
+        log_command_stats(command_stats, logger)
+        prefetcher.close(logger)
+        print(f"Final promoted SDC with {written} constraints written to {args.target_sdc}")
+        return
+
+    log_command_stats(command_stats, logger)
+
+    if args.compact:
+        all_promoted_lines = compact_constraints(all_promoted_lines, bit_connectivity.ranges, logger)
+
     # Merge with initial SDC if provided
     if initial_sdc_lines:
         logger.debug("Merging with initial SDC...")
-        final_lines = merge_with_initial_sdc(initial_sdc_lines, all_promoted_lines)
+        final_lines = merge_with_initial_sdc(initial_sdc_lines, all_promoted_lines, bundle_parsed)
     else:
         final_lines = all_promoted_lines
 
     # Remove duplicates across all promoted SDC lines
-    final_lines = remove_duplicates(final_lines)
+    final_lines = remove_duplicates(final_lines, bundle_parsed)
 
-    with open(args.target_sdc, 'w') as f:
+    with open_file(args.target_sdc, 'w') as f:
         f.writelines(final_lines)
+    if args.bundle_out:
+        with BundleWriter(args.bundle_out, bundle_records) as bundle:
+            for line in final_lines:
+                bundle.write(line, getattr(line, 'origin', None))
+        logger.info(f"Constraint bundle with {bundle.count} records written to {args.bundle_out}")
+    prefetcher.close(logger)
 
     print(f"Final promoted SDC with {len(final_lines)} constraints written to {args.target_sdc}")
 
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+SDC Constraint Bundles
+
+A versioned JSON Lines form of a promoted constraint set, for scripts that
+would otherwise re-parse the Tcl text this tool writes. The first line is a
+header naming the format and version; every other line is one constraint
+(or comment) in output order, with its exact SDC text, command, options,
+positional arguments (values such as the delay of set_input_delay, and
+object queries as written), object queries with their resolved objects, and
+the instance and source location it was promoted from. Joining the texts gives back the SDC file
+byte for byte.
+
+Usage:
+    python3 scripts/sdc_bundle.py runs/top.bundle.jsonl -o runs/top.sdc
+
+Author: Ahmad Houraniah
+"""
+
+import argparse
+import json
+import sys
+
+from compressed_io import open_file
+from sdc_lexer import lex_command
+
+BUNDLE_FORMAT = 'sdc-promotion-bundle'
+BUNDLE_VERSION = 2
+
+
+def bundle_record(text, instance=None, location=None):
+    """Build the bundle record of one output line; location is a (file, line) pair."""
+    command = lex_command(text)
+    return {
+        'text': text,
+        'command': command.name,
+        'options': [list(option) for option in command.options],
+        'arguments': list(command.arguments),
+        'objects': [{'query': collection.command, 'options': list(collection.options),
+                     'objects': list(collection.objects)} for collection in command.collections],
+        'instance': instance,
+        'source': {'file': location[0], 'line': location[1]} if location and location[0] else None,
+    }
+
+
+class BundleWriter:
+    """
+    Write a bundle one line at a time, each with the (instance, (file, line))
+    it came from; lines without one, such as merged or compacted ones, are
+    recorded without provenance. records maps lines read from an earlier
+    bundle to their records, which are written back as they are instead of
+    being lexed again.
+    """
+
+    def __init__(self, path, records=None):
+        self.path = path
+        self.records = records if records is not None else {}
+        self.file = None
+        self.count = 0
+
+    def __enter__(self):
+        self.file = open_file(self.path, 'w', encoding='utf-8')
+        self.file.write(json.dumps({'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION}) + '\n')
+        return self
+
+    def write(self, text, origin=None):
+        record = self.records.get(text)
+        if record is None:
+            instance, location = origin or (None, None)
+            record = bundle_record(text, instance, location)
+        self.file.write(json.dumps(record) + '\n')
+        self.count += 1
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+def read_bundle(path):
+    """Read the records of a bundle, checking its header. Raises RuntimeError for other files or versions."""
+    with open_file(path, encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != BUNDLE_FORMAT:
+            raise RuntimeError(f"{path} is not an SDC constraint bundle")
+        if header.get('version') != BUNDLE_VERSION:
+            raise RuntimeError(f"Unsupported bundle version {header.get('version')} in {path} "
+                               f"(expected {BUNDLE_VERSION})")
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_origin(record):
+    """Return the (instance, (file, line)) provenance of a bundle record."""
+    source = record.get('source')
+    return record.get('instance'), ((source['file'], source['line']) if source else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the SDC text of a constraint bundle")
+    parser.add_argument("bundle", help="Bundle written by promote_sdc.py --bundle_out")
+    parser.add_argument("-o", "--output", help="Output SDC file (default: standard output)")
+    args = parser.parse_args()
+
+    records = read_bundle(args.bundle)
+    if args.output:
+        with open_file(args.output, 'w') as f:
+            f.writelines(record['text'] for record in records)
+    else:
+        sys.stdout.writelines(record['text'] for record in records)
+
+
+if __name__ == "__main__":
+    main()
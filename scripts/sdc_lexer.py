@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+SDC Lexer
+
+A Tcl-aware lexer for SDC files shared by the promotion utility and the
+validator. It splits SDC text into commands the way a Tcl interpreter does
+(braces, brackets, quotes, backslash continuations, ';' separators and
+comments) and returns them as a typed constraint IR: command name, words,
+options, object collections and source location.
+
+Author: Ahmad Houraniah
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Tuple, Optional, NamedTuple
+
+from compressed_io import open_file
+
+# Object query commands whose arguments name design objects
+OBJECT_COMMANDS = frozenset({
+    'get_ports', 'get_pins', 'get_nets', 'get_cells', 'get_clocks',
+    'get_registers', 'get_lib_cells', 'get_lib_pins',
+})
+
+# Commands that read another SDC file in place
+SOURCE_COMMANDS = frozenset({'source', 'read_sdc'})
+# Comments expand_sources() puts around the commands of a sourced file
+SOURCE_MARKER_RE = re.compile(r'#\s*(?:Begin|End) source ')
+
+# Options that take a value; any other -flag is a switch
+VALUED_OPTIONS = frozenset({
+    '-name', '-period', '-waveform', '-clock', '-source', '-divide_by', '-multiply_by',
+    '-from', '-to', '-through', '-rise_from', '-rise_to', '-fall_from', '-fall_to',
+    '-rise_through', '-fall_through', '-group', '-lib_cell', '-library', '-pin',
+    '-from_pin', '-to_pin', '-comment', '-duty_cycle', '-edges', '-edge_shift',
+    '-master_clock', '-reference_pin', '-of_objects', '-filter',
+})
+
+# Option values that are numbers rather than a following switch
+NUMBER_RE = re.compile(r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?$')
+# A line that starts a new SDC command (used to recover from unbalanced input)
+COMMAND_START_RE = re.compile(r'[ \t]*(?:#|[A-Za-z_]\w*(?:[ \t]|$))', re.M)
+# A backslash-newline that is not itself escaped
+CONTINUATION_RE = re.compile(r'(?<!\\)((?:\\\\)*)\\\n')
+# Error reported for a group still open at the end of a command
+UNTERMINATED = {'{': "unterminated '{'", '[': "unterminated '['", '"': 'unterminated quote'}
+
+
+class SourceLocation(NamedTuple):
+    """Where a command starts: file name (if any) and 1-based line number."""
+    file: Optional[str]
+    line: int
+
+
+class ObjectCollection(NamedTuple):
+    """
+    One [get_* ...] object query of a command. start and end delimit the
+    bracketed text in SDCCommand.text.
+    """
+    command: str
+    options: Tuple[str, ...]
+    objects: Tuple[str, ...]
+    braced: bool
+    start: int
+    end: int
+
+
+class SDCCommand(NamedTuple):
+    """
+    One SDC command. name is its first word, or None for comments. text is
+    the command with backslash-newline continuations replaced by a space;
+    words are its top-level words with braces and brackets kept verbatim.
+    """
+    name: Optional[str]
+    text: str
+    words: Tuple[str, ...]
+    options: Tuple[Tuple[str, Optional[str]], ...]
+    collections: Tuple[ObjectCollection, ...]
+    location: SourceLocation
+    errors: Tuple[str, ...] = ()
+
+    @property
+    def is_comment(self):
+        return self.name is None
+
+    def option(self, flag, default=None):
+        """Return the value of the first occurrence of an option."""
+        for name, value in self.options:
+            if name == flag:
+                return value
+        return default
+
+    def has_option(self, flag):
+        return any(name == flag for name, _ in self.options)
+
+    @property
+    def arguments(self):
+        """Positional words after the name: neither options nor their values, e.g. the delay of set_input_delay."""
+        return _split_arguments(self.words)[1]
+
+
+def _glued(text, pos):
+    """True if a word-level group closing just before pos runs straight into more text."""
+    return pos < len(text) and not text[pos].isspace() and text[pos] != ';'
+
+
+def _split_words(text):
+    """
+    Split command text into top-level words. Returns (word_spans, errors);
+    braces, brackets and quotes group their contents into one word.
+    """
+    spans = []
+    errors = []
+    stack = []
+    start = None
+    pos = 0
+    length = len(text)
+    while pos < length:
+        ch = text[pos]
+        top = stack[-1] if stack else None
+        if ch == '\\':
+            if start is None:
+                start = pos
+            pos += 2
+            continue
+        if top is None and ch.isspace():
+            if start is not None:
+                spans.append((start, pos))
+                start = None
+            pos += 1
+            continue
+        if start is None:
+            start = pos
+        if top == '{':
+            if ch == '{':
+                stack.append('{')
+            elif ch == '}':
+                stack.pop()
+                if not stack and text[start] == '{' and _glued(text, pos + 1):
+                    errors.append("extra characters after close-brace")
+        elif ch == '{':
+            stack.append('{')
+        elif ch == '[':
+            if top is None and text[start] == '-':
+                errors.append("option runs into '['")
+            stack.append('[')
+        elif ch == '"':
+            if top == '"':
+                stack.pop()
+            elif pos == start or top == '[':
+                stack.append('"')
+        elif ch == ']':
+            if top == '[':
+                stack.pop()
+                if not stack and text[start] == '[' and _glued(text, pos + 1):
+                    errors.append("extra characters after close-bracket")
+            elif top is None:
+                errors.append("unmatched ']'")
+        elif ch == '}' and top is None:
+            errors.append("unmatched '}'")
+        pos += 1
+    if start is not None:
+        spans.append((start, length))
+    for opener in stack:
+        errors.append(UNTERMINATED[opener])
+    return spans, errors
+
+
+def _split_arguments(words):
+    """Split the words after the command name into (options, positional words); switches get None."""
+    options = []
+    positionals = []
+    index = 1
+    while index < len(words):
+        word = words[index]
+        if word.startswith('-') and not NUMBER_RE.match(word) and len(word) > 1:
+            value = None
+            if word in VALUED_OPTIONS and index + 1 < len(words):
+                following = words[index + 1]
+                if not following.startswith('-') or NUMBER_RE.match(following):
+                    value = following
+                    index += 1
+            options.append((word, value))
+        else:
+            positionals.append(word)
+        index += 1
+    return tuple(options), tuple(positionals)
+
+
+def _parse_options(words):
+    """Pair -flags with their values; switches get None."""
+    return _split_arguments(words)[0]
+
+
+def _find_collections(text):
+    """Locate every [get_* ...] query of a command, nested ones included."""
+    collections = []
+    pos = 0
+    while True:
+        start = text.find('[', pos)
+        if start == -1:
+            break
+        pos = start + 1
+        match = re.match(r'\[\s*([A-Za-z_]\w*)', text[start:])
+        if not match or match.group(1) not in OBJECT_COMMANDS:
+            continue
+        depth = 0
+        brace_depth = 0
+        end = start
+        while end < len(text):
+            ch = text[end]
+            if ch == '\\':
+                end += 2
+                continue
+            if ch == '{':
+                brace_depth += 1
+            elif ch == '}':
+                brace_depth = max(brace_depth - 1, 0)
+            elif brace_depth == 0 and ch == '[':
+                depth += 1
+            elif brace_depth == 0 and ch == ']':
+                depth -= 1
+                if depth == 0:
+                    break
+            end += 1
+        if end >= len(text):
+            continue
+        inner = text[start + match.end():end]
+        spans, _ = _split_words(inner)
+        options = []
+        objects = []
+        braced = False
+        for word_start, word_end in spans:
+            word = inner[word_start:word_end]
+            if word.startswith('-') and not objects:
+                options.append(word)
+            elif word.startswith('{') and word.endswith('}'):
+                braced = True
+                objects.extend(split_collection_objects(word[1:-1]))
+            else:
+                objects.append(word)
+        collections.append(ObjectCollection(match.group(1), tuple(options), tuple(objects),
+                                            braced, start, end + 1))
+    return tuple(collections)
+
+
+def split_collection_objects(text):
+    """Split the inside of a braced object list, keeping '\\name [3:0]' together."""
+    objects = []
+    for word in text.split():
+        if word.startswith('[') and objects and objects[-1].startswith('\\'):
+            objects[-1] += ' ' + word
+        else:
+            objects.append(word)
+    return objects
+
+
+def build_command(text, location=SourceLocation(None, 1), errors=()):
+    """Build the IR of one command from its (continuation-joined) text."""
+    stripped = text.strip()
+    if not stripped or stripped.startswith('#'):
+        return SDCCommand(None, text, (), (), (), location, tuple(errors))
+    spans, word_errors = _split_words(text)
+    words = tuple(text[start:end] for start, end in spans)
+    return SDCCommand(words[0], text, words, _parse_options(words), _find_collections(text), location,
+                      tuple(dict.fromkeys(tuple(errors) + tuple(word_errors))))
+
+
+@lru_cache(maxsize=1 << 16)
+def lex_command(text):
+    """
+    Lex a single command line (cached: promoted lines are revisited by several
+    stages). Continuations are blanked in place, so collection offsets index
+    the given text.
+    """
+    return build_command(CONTINUATION_RE.sub(r'\1  ', text).rstrip('\r\n'))
+
+
+def _recovers_at(text, pos):
+    """True when the next non-blank line after pos starts a new command or a comment."""
+    while True:
+        match = COMMAND_START_RE.match(text, pos)
+        if match:
+            return True
+        newline = text.find('\n', pos)
+        if newline == -1 or text[pos:newline].strip():
+            return False
+        pos = newline + 1
+
+
+def lex_sdc(text, filename=None, first_line=1):
+    """
+    Split SDC text into SDCCommand records, in order. first_line is the line
+    number of the start of text in its file.
+
+    Newlines and ';' end a command outside braces, brackets and quotes, and a
+    backslash-newline continues it. A '#' where a command starts begins a
+    comment running to the end of the line. When a brace, bracket or quote is
+    still open at a newline and the next line starts a new command, the open
+    command is closed with an error instead of swallowing the rest of the file.
+    """
+    commands = []
+    pos = 0
+    line = first_line
+    length = len(text)
+    while pos < length:
+        # Skip whitespace and empty commands
+        ch = text[pos]
+        if ch == '\n':
+            line += 1
+            pos += 1
+            continue
+        if ch.isspace() or ch == ';':
+            pos += 1
+            continue
+        if ch == '\\' and text.startswith('\n', pos + 1):
+            line += 1
+            pos += 2
+            continue
+
+        start, start_line = pos, line
+        # Back up over indentation so comment text keeps it
+        while start > 0 and text[start - 1] in ' \t':
+            start -= 1
+        errors = []
+        if ch == '#':
+            end = pos
+            while end < length and text[end] != '\n':
+                if text[end] == '\\':
+                    if text.startswith('\n', end + 1):
+                        line += 1
+                    end += 2
+                    continue
+                end += 1
+            raw = text[start:end]
+            commands.append(build_command(CONTINUATION_RE.sub(r'\1 ', raw).rstrip('\r'),
+                                          SourceLocation(filename, start_line)))
+            pos = end
+            continue
+
+        stack = []
+        end = pos
+        word_start = True
+        while end < length:
+            ch = text[end]
+            top = stack[-1] if stack else None
+            if ch == '\\':
+                if text.startswith('\n', end + 1):
+                    line += 1
+                end += 2
+                word_start = False
+                continue
+            if ch == '\n':
+                if not stack:
+                    break
+                if _recovers_at(text, end + 1):
+                    errors.extend(UNTERMINATED[opener] for opener in stack)
+                    break
+                line += 1
+                end += 1
+                word_start = True
+                continue
+            if top is None and ch == ';':
+                break
+            if top == '{':
+                if ch == '{':
+                    stack.append('{')
+                elif ch == '}':
+                    stack.pop()
+            elif ch == '{':
+                stack.append('{')
+            elif ch == '[':
+                stack.append('[')
+            elif ch == '"':
+                if top == '"':
+                    stack.pop()
+                elif word_start or top == '[':
+                    stack.append('"')
+            elif ch == ']' and top == '[':
+                stack.pop()
+            word_start = ch.isspace()
+            end += 1
+        else:
+            errors.extend(UNTERMINATED[opener] for opener in stack)
+
+        raw = CONTINUATION_RE.sub(r'\1 ', text[start:end]).rstrip()
+        commands.append(build_command(raw, SourceLocation(filename, start_line), errors))
+        pos = end
+    return commands
+
+
+def read_sdc_commands(sdc_file, encoding='utf-8'):
+    """Read and lex an SDC file. Returns a list of SDCCommand."""
+    with open_file(sdc_file, encoding=encoding) as f:
+        return lex_sdc(f.read(), str(sdc_file))
+
+
+class _LineState:
+    """Lexer state carried from one physical line to the next by iter_sdc_commands."""
+    __slots__ = ('stack', 'in_command', 'in_comment', 'continued')
+
+    def __init__(self):
+        self.stack = []
+        self.in_command = False
+        self.in_comment = False
+        self.continued = False
+
+
+def _scan_line(body, state):
+    """Advance the state over one physical line (without its newline), following lex_sdc."""
+    stack = state.stack
+    word_start = not state.continued
+    pos = 0
+    length = len(body)
+    while pos < length:
+        ch = body[pos]
+        if not state.in_command:
+            if ch.isspace() or ch == ';' or (ch == '\\' and pos == length - 1):
+                pos += 1
+                continue
+            if ch == '#':
+                state.in_comment = True
+                return
+            state.in_command = True
+            word_start = True
+        top = stack[-1] if stack else None
+        if ch == '\\':
+            pos += 2
+            word_start = False
+            continue
+        if top is None and ch == ';':
+            state.in_command = False
+            pos += 1
+            continue
+        if top == '{':
+            if ch == '{':
+                stack.append('{')
+            elif ch == '}':
+                stack.pop()
+        elif ch == '{':
+            stack.append('{')
+        elif ch == '[':
+            stack.append('[')
+        elif ch == '"':
+            if top == '"':
+                stack.pop()
+            elif word_start or top == '[':
+                stack.append('"')
+        elif ch == ']' and top == '[':
+            stack.pop()
+        word_start = ch.isspace()
+        pos += 1
+
+
+def iter_sdc_commands(sdc_file, encoding='utf-8'):
+    """
+    Lex an SDC file incrementally, yielding SDCCommand records in order.
+
+    Produces the same commands as read_sdc_commands, but only the command being
+    read is held in memory, so the file size does not bound the run.
+    """
+    filename = str(sdc_file)
+    with open_file(sdc_file, encoding=encoding) as f:
+        buffer = []
+        first_line = 1
+        state = _LineState()
+        for line_num, line in enumerate(f, 1):
+            body = line.rstrip('\r\n')
+            if state.stack and not state.continued and COMMAND_START_RE.match(body):
+                # An unbalanced command is closed when the next command starts
+                yield from lex_sdc(''.join(buffer), filename, first_line)
+                buffer = []
+                state = _LineState()
+            if not buffer:
+                first_line = line_num
+            buffer.append(line)
+            if not state.in_comment:
+                _scan_line(body, state)
+            state.continued = (len(body) - len(body.rstrip('\\'))) % 2 == 1
+            if state.continued:
+                continue
+            state.in_comment = False
+            if not state.stack:
+                yield from lex_sdc(''.join(buffer), filename, first_line)
+                buffer = []
+                state.in_command = False
+        if buffer:
+            yield from lex_sdc(''.join(buffer), filename, first_line)
+
+
+def sourced_file(command):
+    """
+    Return the file a source/read_sdc command reads, or None for other commands
+    and for names computed by Tcl. A relative name is looked up next to the
+    sourcing file first, then in the working directory.
+    """
+    if command.name not in SOURCE_COMMANDS or len(command.words) < 2:
+        return None
+    name = command.words[-1]
+    if name[:1] in ('{', '"'):
+        name = name[1:-1]
+    if not name or name.startswith('-') or '$' in name or '[' in name:
+        return None
+    if not os.path.isabs(name) and command.location.file:
+        local = os.path.join(os.path.dirname(command.location.file), name)
+        if os.path.isfile(local):
+            return os.path.normpath(local)
+    return os.path.normpath(name)
+
+
+@lru_cache(maxsize=None)
+def read_sourced_sdc(path):
+    """Lex an SDC file read by source/read_sdc; a file shared by several IPs is lexed once per run."""
+    return tuple(read_sdc_commands(path))
+
+
+def expand_sources(commands, read=read_sourced_sdc, _stack=()):
+    """
+    Yield commands with every source/read_sdc replaced by the commands of the
+    file it reads, recursively, between '# Begin source <file>' and
+    '# End source <file>' comments. Included commands keep their own file and
+    line in location. A directive naming a missing file, or a file already
+    being read, is yielded as it is with the reason in its errors.
+    """
+    for command in commands:
+        path = sourced_file(command)
+        if path is None:
+            yield command
+            continue
+        including = command.location.file
+        stack = _stack or ((os.path.realpath(including),) if including else ())
+        key = os.path.realpath(path)
+        if not os.path.isfile(path):
+            yield command._replace(errors=command.errors + (f"sourced file not found: {path}",))
+        elif key in stack:
+            yield command._replace(errors=command.errors + (f"source cycle: {path}",))
+        else:
+            yield build_command(f"# Begin source {path}", command.location)
+            yield from expand_sources(read(path), read, stack + (key,))
+            yield build_command(f"# End source {path}", command.location)
+
+
+def command_targets(command):
+    """Return the objects named by the port, pin and net collections of a command."""
+    targets = []
+    for collection in command.collections:
+        if collection.command in ('get_ports', 'get_pins', 'get_nets'):
+            targets.extend(collection.objects)
+    return targets
@@ -33,6 +33,9 @@ import argparse
 from typing import List, Dict, Tuple, Optional, NamedTuple
 from pathlib import Path
 
+from compressed_io import open_file
+from sdc_lexer import SDCCommand, lex_sdc
+
 class ValidationResult(NamedTuple):
     """Result of SDC validation"""
     is_valid: bool
@@ -426,11 +429,11 @@ exit 0
         warnings = []
         
         try:
-            with open(sdc_file, 'r', encoding='utf-8') as f:
+            with open_file(sdc_file, 'r', encoding='utf-8') as f:
                 content = f.read()
         except UnicodeDecodeError:
             try:
-                with open(sdc_file, 'r', encoding='latin-1') as f:
+                with open_file(sdc_file, 'r', encoding='latin-1') as f:
                     content = f.read()
                 warnings.append("File encoding is not UTF-8, used Latin-1")
             except Exception as e:
@@ -442,14 +445,12 @@ exit 0
                     validator_used="custom_sdc"
                 )
         
-        lines = content.split('\n')
-        
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
+        for command in lex_sdc(content, sdc_file):
+            # Skip comments
+            if command.is_comment:
                 continue
+            line = command.text.strip()
+            line_num = command.location.line
             
             # Basic SDC command validation
             found_command = False
@@ -491,12 +492,12 @@ exit 0
         warnings = []
         
         try:
-            with open(sdc_file, 'r', encoding='utf-8') as f:
+            with open_file(sdc_file, 'r', encoding='utf-8') as f:
                 content = f.read()
         except UnicodeDecodeError:
             # Try with different encoding
             try:
-                with open(sdc_file, 'r', encoding='latin-1') as f:
+                with open_file(sdc_file, 'r', encoding='latin-1') as f:
                     content = f.read()
                 warnings.append("File encoding is not UTF-8, used Latin-1")
             except Exception as e:
@@ -508,25 +509,19 @@ exit 0
                     validator_used="syntax_check"
                 )
         
-        lines = content.split('\n')
+        commands = [command for command in lex_sdc(content, sdc_file) if not command.is_comment]
         
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-            
+        for command in commands:
             # Check for basic syntax issues
-            syntax_errors = self._check_line_syntax(line, line_num)
+            syntax_errors = self._check_line_syntax(command)
             errors.extend(syntax_errors)
             
             # Check for known SDC commands
-            syntax_warnings = self._check_command_syntax(line, line_num)
+            syntax_warnings = self._check_command_syntax(command.text.strip(), command.location.line)
             warnings.extend(syntax_warnings)
         
         # Check for basic constraint consistency
-        consistency_issues = self._check_constraint_consistency(content)
+        consistency_issues = self._check_constraint_consistency(commands)
         warnings.extend(consistency_issues)
         
         is_valid = len(errors) == 0
@@ -538,33 +533,9 @@ exit 0
             validator_used="syntax_check"
         )
     
-    def _check_line_syntax(self, line: str, line_num: int) -> List[str]:
-        """Check basic syntax issues in a line"""
-        errors = []
-        
-        # Check for unmatched braces
-        open_braces = line.count('{')
-        close_braces = line.count('}')
-        if open_braces != close_braces:
-            errors.append(f"Line {line_num}: Unmatched braces ({{ {open_braces}, }} {close_braces})")
-        
-        # Check for unmatched brackets
-        open_brackets = line.count('[')
-        close_brackets = line.count(']')
-        if open_brackets != close_brackets:
-            errors.append(f"Line {line_num}: Unmatched brackets ([ {open_brackets}, ] {close_brackets})")
-        
-        # Check for basic TCL syntax issues
-        if line.endswith('\\') and not line.endswith('\\\\'):
-            # Line continuation should be followed by actual continuation
-            pass  # This is actually valid TCL
-        
-        # Check for incomplete strings
-        quote_count = line.count('"')
-        if quote_count % 2 != 0:
-            errors.append(f"Line {line_num}: Unmatched quotes")
-        
-        return errors
+    def _check_line_syntax(self, command: SDCCommand) -> List[str]:
+        """Report the unbalanced braces, brackets and quotes found by the lexer"""
+        return [f"Line {command.location.line}: {error[0].upper()}{error[1:]}" for error in command.errors]
     
     def _check_command_syntax(self, line: str, line_num: int) -> List[str]:
         """Check SDC command syntax"""
@@ -597,16 +568,17 @@ exit 0
         
         return warnings
     
-    def _check_constraint_consistency(self, content: str) -> List[str]:
+    def _check_constraint_consistency(self, commands: List[SDCCommand]) -> List[str]:
         """Check for constraint consistency issues"""
         warnings = []
         
         # Look for clock definitions
-        clock_matches = re.findall(r'create_clock\s+.*?-name\s+(\w+)', content, re.IGNORECASE)
-        clocks = set(clock_matches)
+        clocks = {command.option('-name').strip('{}') for command in commands
+                  if command.name == 'create_clock' and command.option('-name')}
         
         # Look for clock references in other constraints
-        clock_refs = re.findall(r'-clock\s+(\w+)', content, re.IGNORECASE)
+        clock_refs = [value for value in (command.option('-clock') for command in commands)
+                      if value and re.match(r'\w+$', value)]
         
         # Check for undefined clock references
         for clock_ref in clock_refs:
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Yosys JSON Netlists
+
+Reader for netlists written by Yosys `write_json`, used by the promotion
+utility as a structured alternative to scanning Verilog text. The file is
+decoded one module at a time, and each module is reduced to its ports, named
+nets and cells, all kept as the bit (net id) arrays Yosys writes, so
+connections resolve per bit without parsing expressions.
+
+Author: Ahmad Houraniah
+"""
+
+import json
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, NamedTuple, Tuple
+
+from compressed_io import open_file
+
+# Cells that store state; every other internal ($) cell connects its inputs to its outputs
+STORAGE_CELL_RE = re.compile(r'dff|latch|\$_?sr|\$_?ff|\$mem', re.I)
+SIMPLE_IDENT_RE = re.compile(r'[A-Za-z_][\w$]*$')
+# Instance names of generate scopes and arrays, e.g. g_lane[0].u_lane
+SCOPED_INSTANCE_RE = re.compile(r'[A-Za-z_][\w$]*(?:\[\d+\])*(?:\.[A-Za-z_][\w$]*(?:\[\d+\])*)*$')
+
+
+def is_yosys_json(path):
+    """True for an --target_rtl/--source_rtl argument naming a Yosys JSON netlist (*.json, optionally compressed)."""
+    return re.search(r'\.json(?:\.(?:gz|bz2|xz))?$', str(path)) is not None
+
+
+class NetlistWire(NamedTuple):
+    """A port or named net: its bits (net ids, LSB first, or '0'/'1'/'x'/'z') and declared LSB."""
+    bits: Tuple
+    offset: int = 0
+    upto: bool = False
+
+    def index(self, position):
+        """Verilog index of the bit at a position of bits."""
+        return self.offset + (len(self.bits) - 1 - position if self.upto else position)
+
+
+class NetlistCell(NamedTuple):
+    """A cell: module or internal ($) type and the bits of each connected port."""
+    type: str
+    connections: Dict[str, Tuple]
+    directions: Dict[str, str]
+
+
+class NetlistModule(NamedTuple):
+    """One module of a netlist. nets holds the named nets, ports included, by Verilog name."""
+    ports: Dict[str, Tuple[str, NetlistWire]]  # name -> (direction, wire)
+    nets: Dict[str, NetlistWire]
+    cells: Dict[str, NetlistCell]
+    top: bool
+
+
+class _JsonReader:
+    """Incremental JSON decoding over a text stream, one value at a time."""
+
+    def __init__(self, stream, chunk_size=1 << 20):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        chunk = self.stream.read(size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+    def peek(self):
+        """Return the next character that is not whitespace or ',', or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n,':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill(self.chunk_size)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON netlist: expected '{char}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete value, reading further while it is cut off by the buffer."""
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # Growing geometrically keeps retries linear in the size of the value
+                self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def iter_netlist_modules(path):
+    """
+    Yield (name, module dict) for every module of a Yosys JSON netlist. Only
+    one module is decoded at a time, so the size of the file does not bound
+    memory; other top-level keys are skipped.
+    """
+    with open_file(path, encoding='utf-8') as f:
+        reader = _JsonReader(f)
+        reader.expect('{')
+        while reader.peek() == '"':
+            key = reader.value()
+            reader.expect(':')
+            if key != 'modules':
+                reader.value()
+                continue
+            reader.expect('{')
+            while reader.peek() == '"':
+                name = reader.value()
+                reader.expect(':')
+                yield name, reader.value()
+            reader.expect('}')
+        reader.expect('}')
+
+
+def verilog_name(name):
+    """Verilog spelling of a Yosys public name: escaped when it is not a simple identifier."""
+    return name if SIMPLE_IDENT_RE.match(name) else '\\' + name
+
+
+def instance_name(name):
+    """Name of a cell as the Verilog indexer spells it: generate scopes joined by '/'."""
+    if name.startswith('$'):
+        return name
+    return name.replace('.', '/') if SCOPED_INSTANCE_RE.match(name) else verilog_name(name)
+
+
+def is_internal_cell(cell_type):
+    """True for Yosys internal cells ($and, $dff, ...), as opposed to instances of design modules."""
+    return cell_type.startswith('$') and not cell_type.startswith(('$paramod', '$abstract'))
+
+
+def _wire(entry):
+    return NetlistWire(tuple(entry['bits']), int(entry.get('offset', 0)), bool(entry.get('upto', 0)))
+
+
+def _netlist_module(module):
+    """Reduce a decoded module to its ports, named nets and cells."""
+    ports = OrderedDict((verilog_name(name), (entry['direction'], _wire(entry)))
+                        for name, entry in module.get('ports', {}).items())
+    nets = OrderedDict((name, wire) for name, (_, wire) in ports.items())
+    for name, entry in module.get('netnames', {}).items():
+        if not entry.get('hide_name'):
+            nets.setdefault(verilog_name(name), _wire(entry))
+    cells = OrderedDict()
+    for name, entry in module.get('cells', {}).items():
+        cell_type = entry['type'] if is_internal_cell(entry['type']) else verilog_name(entry['type'])
+        connections = {port: tuple(bits) for port, bits in entry.get('connections', {}).items()}
+        cells[instance_name(name)] = NetlistCell(cell_type, connections, entry.get('port_directions', {}))
+    top = str(module.get('attributes', {}).get('top', '0')).strip('0') != ''
+    return NetlistModule(ports, nets, cells, top)
+
+
+@lru_cache(maxsize=None)
+def read_netlist(path):
+    """Read a Yosys JSON netlist into an OrderedDict of module name -> NetlistModule."""
+    return OrderedDict((verilog_name(name), _netlist_module(module)) for name, module in iter_netlist_modules(path))
+
+
+class BitNamer:
+    """
+    Spell bit arrays of one module as Verilog expressions over its named nets:
+    a net, a bit or part select, a sized constant, or a {..} concatenation.
+    Ports name their bits before other nets do.
+    """
+
+    def __init__(self, module):
+        self.nets = module.nets
+        self.names = {}  # net id -> (net, position in its bits)
+        self.whole = {}  # bits of a net -> net
+        for name, wire in reversed(list(module.nets.items())):  # earlier nets win
+            self.names.update(zip(wire.bits, zip(repeat(name), range(len(wire.bits)))))
+            if all(isinstance(bit, int) for bit in wire.bits):
+                self.whole[wire.bits] = name
+
+    def _select(self, net, first, last):
+        """Spell positions first..last (LSB first) of a net."""
+        wire = self.nets[net]
+        if first == 0 and last == len(wire.bits) - 1:
+            return net
+        if first == last:
+            return f"{net}[{wire.index(first)}]"
+        return f"{net}[{wire.index(last)}:{wire.index(first)}]"
+
+    def expression(self, bits):
+        """Return the expression connecting bits, or None when a bit has no name."""
+        bits = tuple(bits)
+        if bits in self.whole:
+            return self.whole[bits]
+        if bits and isinstance(bits[0], int) and bits[0] in self.names:
+            # Fast path: one contiguous slice of a net
+            net, position = self.names[bits[0]]
+            if self.nets[net].bits[position:position + len(bits)] == bits:
+                return self._select(net, position, position + len(bits) - 1)
+
+        runs = []  # [net or None, first position, last position, constant digits] from the LSB up
+        for bit in bits:
+            if not isinstance(bit, int):
+                if runs and runs[-1][0] is None:
+                    runs[-1][3] = bit + runs[-1][3]
+                else:
+                    runs.append([None, 0, 0, bit])
+                continue
+            if bit not in self.names:
+                return None
+            net, position = self.names[bit]
+            if runs and runs[-1][0] == net and position == runs[-1][2] + 1:
+                runs[-1][2] = position
+            else:
+                runs.append([net, position, position, None])
+        parts = [f"{len(digits)}'b{digits}" if net is None else self._select(net, first, last)
+                 for net, first, last, digits in reversed(runs)]
+        return parts[0] if len(parts) == 1 else '{' + ', '.join(parts) + '}'
+
+
+def io_reach(module):
+    """
+    Return the net ids connected to a port of module, directly or through
+    internal combinational cells; a cell's inputs and outputs reach I/O
+    together, while storage cells and module instances are boundaries.
+    """
+    groups = []
+    touching = {}
+    for cell in module.cells.values():
+        if not is_internal_cell(cell.type) or STORAGE_CELL_RE.search(cell.type):
+            continue
+        group = {bit for bits in cell.connections.values() for bit in bits if isinstance(bit, int)}
+        for bit in group:
+            touching.setdefault(bit, []).append(len(groups))
+        groups.append(group)
+
+    reached = {bit for _, wire in module.ports.values() for bit in wire.bits if isinstance(bit, int)}
+    pending = [bit for bit in reached if bit in touching]
+    visited_groups = set()
+    while pending:
+        for group in touching[pending.pop()]:
+            if group not in visited_groups:
+                visited_groups.add(group)
+                new_bits = groups[group] - reached
+                reached |= new_bits
+                pending.extend(bit for bit in new_bits if bit in touching)
+    return reached
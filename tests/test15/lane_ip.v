@@ -0,0 +1,19 @@
+// Small serial lane IP instantiated many times by the top level
+module lane_ip (
+    input wire clk,
+    input wire rst_n,
+    input wire [7:0] rx_data,
+    input wire rx_valid,
+    output reg [7:0] tx_data,
+    output reg tx_valid
+);
+    always @(posedge clk or negedge rst_n) begin
+        if (!rst_n) begin
+            tx_data <= 8'd0;
+            tx_valid <= 1'b0;
+        end else begin
+            tx_data <= rx_data;
+            tx_valid <= rx_valid;
+        end
+    end
+endmodule
@@ -0,0 +1,57 @@
+// Top level with lane_ip instances discovered by --module:
+// a plain instance, a generate loop and an instance array
+module top #(
+    parameter NUM_LANES = 4
+) (
+    input wire clk,
+    input wire rst_n,
+    input wire [7:0] ctrl_rx_data,
+    input wire ctrl_rx_valid,
+    output wire [7:0] ctrl_tx_data,
+    output wire ctrl_tx_valid,
+    input wire [NUM_LANES*8-1:0] lane_rx_data,
+    input wire [NUM_LANES-1:0] lane_rx_valid,
+    output wire [NUM_LANES*8-1:0] lane_tx_data,
+    output wire [NUM_LANES-1:0] lane_tx_valid,
+    input wire [15:0] aux_rx_data,
+    input wire [1:0] aux_rx_valid,
+    output wire [15:0] aux_tx_data,
+    output wire [1:0] aux_tx_valid
+);
+
+    // Control lane
+    lane_ip u_ctrl_lane (
+        .clk(clk),
+        .rst_n(rst_n),
+        .rx_data(ctrl_rx_data),
+        .rx_valid(ctrl_rx_valid),
+        .tx_data(ctrl_tx_data),
+        .tx_valid(ctrl_tx_valid)
+    );
+
+    // Data lanes
+    genvar i;
+    generate
+        for (i = 0; i < NUM_LANES; i = i + 1) begin : g_lane
+            lane_ip u_lane (
+                .clk(clk),
+                .rst_n(rst_n),
+                .rx_data(lane_rx_data[i*8 +: 8]),
+                .rx_valid(lane_rx_valid[i]),
+                .tx_data(lane_tx_data[i*8 +: 8]),
+                .tx_valid(lane_tx_valid[i])
+            );
+        end
+    endgenerate
+
+    // Auxiliary lanes as an instance array
+    lane_ip u_aux [1:0] (
+        .clk(clk),
+        .rst_n(rst_n),
+        .rx_data(aux_rx_data),
+        .rx_valid(aux_rx_valid),
+        .tx_data(aux_tx_data),
+        .tx_valid(aux_tx_valid)
+    );
+
+endmodule
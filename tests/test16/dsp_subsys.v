@@ -0,0 +1,23 @@
+// Subsystem wrapping the DSP IP; its ports are wider than the IP's
+module dsp_subsys (
+    input wire sub_clk,
+    input wire sub_rst_n,
+    input wire [15:0] sub_samples,
+    input wire sub_valid,
+    output wire [15:0] sub_results,
+    output wire sub_result_valid
+);
+    wire dsp_clk;
+    assign dsp_clk = sub_clk;
+
+    dsp_ip u_dsp (
+        .clk(dsp_clk),
+        .rst_n(sub_rst_n),
+        .sample_in(sub_samples[15:8]),
+        .sample_valid(sub_valid),
+        .result_out(sub_results[15:8]),
+        .result_valid(sub_result_valid)
+    );
+
+    assign sub_results[7:0] = 8'd0;
+endmodule
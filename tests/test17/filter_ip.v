@@ -0,0 +1,24 @@
+// Simple filter IP with a status bus and an interrupt
+module filter_ip (
+    input  wire       clk,
+    input  wire       rst_n,
+    input  wire [7:0] din,
+    output reg  [7:0] dout,
+    output wire [3:0] status,
+    output wire       irq
+);
+    reg [7:0] prev;
+
+    always @(posedge clk or negedge rst_n) begin
+        if (!rst_n) begin
+            prev <= 8'd0;
+            dout <= 8'd0;
+        end else begin
+            prev <= din;
+            dout <= (din >> 1) + (prev >> 1);
+        end
+    end
+
+    assign status = {dout[7], prev[7], din[7], rst_n};
+    assign irq    = dout[7] & ~prev[7];
+endmodule
@@ -0,0 +1,5 @@
+// SoC design filelist
++incdir+tests/test18/include
+tests/test18/rtl/soc_top.v
+tests/test18/rtl/periph_subsys.v
+-f tests/test18/ip/uart_ip.f
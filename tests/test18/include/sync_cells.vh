@@ -0,0 +1,12 @@
+// Synchronizer cells shared by the SoC RTL
+module sync_2ff (
+    input  wire clk,
+    input  wire d,
+    output wire q
+);
+    reg [1:0] stages;
+
+    always @(posedge clk) stages <= {stages[0], d};
+
+    assign q = stages[1];
+endmodule
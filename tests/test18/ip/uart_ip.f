@@ -0,0 +1,3 @@
+// UART IP sources
+tests/test18/ip/uart_ip.v
+tests/test18/ip/uart_tx.v
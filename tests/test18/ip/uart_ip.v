@@ -0,0 +1,18 @@
+// UART transmit IP
+module uart_ip (
+    input  wire       clk,
+    input  wire       rst_n,
+    input  wire [7:0] data,
+    input  wire       valid,
+    output wire       txd,
+    output wire       busy
+);
+    uart_tx u_tx (
+        .clk   (clk),
+        .rst_n (rst_n),
+        .data  (data),
+        .load  (valid),
+        .txd   (txd),
+        .busy  (busy)
+    );
+endmodule
@@ -0,0 +1,28 @@
+// UART shift register
+module uart_tx (
+    input  wire       clk,
+    input  wire       rst_n,
+    input  wire [7:0] data,
+    input  wire       load,
+    output wire       txd,
+    output wire       busy
+);
+    reg [9:0] shift_reg;
+    reg [3:0] count_reg;
+
+    always @(posedge clk or negedge rst_n) begin
+        if (!rst_n) begin
+            shift_reg <= 10'h3ff;
+            count_reg <= 4'd0;
+        end else if (load && count_reg == 4'd0) begin
+            shift_reg <= {1'b1, data, 1'b0};
+            count_reg <= 4'd10;
+        end else if (count_reg != 4'd0) begin
+            shift_reg <= {1'b1, shift_reg[9:1]};
+            count_reg <= count_reg - 4'd1;
+        end
+    end
+
+    assign txd  = shift_reg[0];
+    assign busy = (count_reg != 4'd0);
+endmodule
@@ -0,0 +1,18 @@
+// Peripheral subsystem wrapping the UART IP
+module periph_subsys (
+    input  wire       clk,
+    input  wire       rst_n,
+    input  wire [7:0] tx_data,
+    input  wire       tx_valid,
+    output wire       txd,
+    output wire       busy
+);
+    uart_ip u_uart (
+        .clk   (clk),
+        .rst_n (rst_n),
+        .data  (tx_data),
+        .valid (tx_valid),
+        .txd   (txd),
+        .busy  (busy)
+    );
+endmodule
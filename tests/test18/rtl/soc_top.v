@@ -0,0 +1,28 @@
+// SoC top: peripheral subsystem behind a reset synchronizer
+`include "sync_cells.vh"
+
+module soc_top (
+    input  wire       clk,
+    input  wire       rst_n_async,
+    input  wire [7:0] tx_data,
+    input  wire       tx_valid,
+    output wire       uart_txd,
+    output wire       tx_busy
+);
+    wire rst_n;
+
+    sync_2ff u_rst_sync (
+        .clk (clk),
+        .d   (rst_n_async),
+        .q   (rst_n)
+    );
+
+    periph_subsys u_periph (
+        .clk      (clk),
+        .rst_n    (rst_n),
+        .tx_data  (tx_data),
+        .tx_valid (tx_valid),
+        .txd      (uart_txd),
+        .busy     (tx_busy)
+    );
+endmodule
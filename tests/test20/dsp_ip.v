@@ -0,0 +1,23 @@
+// Leaf DSP IP promoted through a subsystem to the chip top
+module dsp_ip (
+    input wire clk,
+    input wire rst_n,
+    input wire [7:0] sample_in,
+    input wire sample_valid,
+    output reg [7:0] result_out,
+    output reg result_valid
+);
+    reg [7:0] acc_reg;
+
+    always @(posedge clk or negedge rst_n) begin
+        if (!rst_n) begin
+            acc_reg <= 8'd0;
+            result_out <= 8'd0;
+            result_valid <= 1'b0;
+        end else begin
+            acc_reg <= acc_reg + sample_in;
+            result_out <= acc_reg;
+            result_valid <= sample_valid;
+        end
+    end
+endmodule
@@ -0,0 +1,15 @@
+// Two-lane receiver IP; each lane arrives on its own 4-bit input
+module lane_pair_ip (
+    input  wire       clk,
+    input  wire       rst_n,
+    input  wire [3:0] lane_a,
+    input  wire [3:0] lane_b,
+    output reg  [7:0] word
+);
+    always @(posedge clk or negedge rst_n) begin
+        if (!rst_n)
+            word <= 8'd0;
+        else
+            word <= {lane_b, lane_a};
+    end
+endmodule
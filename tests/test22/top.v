@@ -0,0 +1,26 @@
+// Receive bus assembled from two pad groups, then buffered and split per lane
+module top (
+    input  wire       pad_clk,
+    input  wire       pad_rst_n,
+    input  wire [3:0] pad_hi,
+    input  wire [3:0] pad_lo,
+    output wire [7:0] rx_word
+);
+    wire       rx_clk;
+    wire [7:0] rx_bus;
+    wire [7:0] rx_bus_q;
+    wire [3:0] lane_hi;
+
+    assign rx_clk   = pad_clk;
+    assign rx_bus   = {pad_hi, pad_lo};
+    assign rx_bus_q = rx_bus;
+    assign lane_hi  = rx_bus_q[7:4];
+
+    lane_pair_ip u_rx (
+        .clk(rx_clk),
+        .rst_n(pad_rst_n),
+        .lane_a(rx_bus[3:0]),
+        .lane_b(lane_hi),
+        .word(rx_word)
+    );
+endmodule
@@ -0,0 +1,12 @@
+// Pair receiver IP; one 8-bit data port and a 2-bit status port
+module pair_ip #(
+    parameter W = 8
+) (
+    input  wire         clk,
+    input  wire [W-1:0] data,
+    input  wire [1:0]   status,
+    output reg  [W-1:0] q
+);
+    always @(posedge clk)
+        q <= status[0] ? data : q;
+endmodule
@@ -0,0 +1,17 @@
+// Instance ports connected straight to concatenations of top-level ports
+module top (
+    input  wire       pad_clk,
+    input  wire [3:0] pe_hi,
+    input  wire [3:0] pe_lo,
+    input  wire       pad_ok,
+    input  wire       pad_err,
+    output wire [7:0] q_out
+);
+    pair_ip #(.W(8)) u_pair (
+        .clk(pad_clk),
+        .data({pe_hi, // upper lane
+               pe_lo}),
+        .status({pad_err, pad_ok}),
+        .q(q_out)
+    );
+endmodule
@@ -0,0 +1,9 @@
+// Byte-wide capture IP
+module bus_ip (
+    input  wire       clk,
+    input  wire [7:0] d,
+    output reg  [7:0] q
+);
+    always @(posedge clk)
+        q <= d;
+endmodule
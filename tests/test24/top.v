@@ -0,0 +1,25 @@
+// Internal buses driven by pads on their low nibble only
+module top (
+    input  wire       pad_clk,
+    input  wire [3:0] pad,
+    input  wire [3:0] cfg_in,
+    output wire [3:0] q_pad
+);
+    wire [7:0] bus;
+    wire [7:0] q_int;
+    reg  [3:0] cfg_q;
+
+    always @(posedge pad_clk)
+        cfg_q <= cfg_in;
+
+    assign bus[3:0] = pad;
+    // Logic links the upper nibble to I/O, but no pad drives it
+    assign bus[7:4] = cfg_q ^ cfg_in;
+    assign q_pad    = q_int[3:0];
+
+    bus_ip u_cap (
+        .clk(pad_clk),
+        .d(bus),
+        .q(q_int)
+    );
+endmodule
@@ -0,0 +1,12 @@
+// Configuration port IP with per-bit constrained buses
+module cfg_ip (
+    input  wire       clk,
+    input  wire       en,
+    input  wire [7:0] din,
+    input  wire [7:0] cfg,
+    output reg  [3:0] st
+);
+    always @(posedge clk)
+        if (en)
+            st <= din[3:0] ^ cfg[3:0];
+endmodule
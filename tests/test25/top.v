@@ -0,0 +1,16 @@
+// Configuration IP wired straight to pads
+module top (
+    input  wire       pad_clk,
+    input  wire       pad_en,
+    input  wire [7:0] pad_din,
+    input  wire [7:0] pad_cfg,
+    output wire [3:0] pad_st
+);
+    cfg_ip u_cfg (
+        .clk(pad_clk),
+        .en(pad_en),
+        .din(pad_din),
+        .cfg(pad_cfg),
+        .st(pad_st)
+    );
+endmodule